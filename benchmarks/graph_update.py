@@ -0,0 +1,122 @@
+"""
+Benchmark comparing the latency of a graph update after adding or removing one month
+with the Plotly PNG backend and the native Flet chart backend.
+An update is timed from the new entries to the serialized page update message,
+through a real Flet page whose connection builds the message instead of sending it.
+Network transfer and the client repaint (and loading the PNG file) are not included.
+Run with: python -m benchmarks.graph_update
+"""
+
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import ClientActions, ClientMessage, CommandEncoder, PageCommandsBatchResponsePayload
+from data.constants import CZECH_MONTHS
+from src import graph
+from src.graph import NativeGraph, RenderCacheSettings, draw_graph
+
+MONTHLY_CHARGE=1500
+ROUNDS=10
+
+
+def _entries(count: int):
+    """
+    Returns count synthetic graph entries.
+    """
+    return [
+        {"month": CZECH_MONTHS[i % 12], "month_number": i % 12, "kwh": 300,
+         "cost": 1400+i*7.5, "diff": round(100-i*7.5, 2), "source": i}
+        for i in range(count)
+    ]
+
+
+class _SerializingConnection(LocalConnection):
+    """
+    Page connection that processes and serializes update commands like the Flet server,
+    counting the bytes that would be sent to the client.
+    """
+    def __init__(self):
+        super().__init__()
+        self.sent_bytes=0
+
+    def send_commands(self, session_id: str, commands):
+        results=[]
+        messages=[]
+        for command in commands:
+            result, message=self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            batch=ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages)
+            self.sent_bytes+=len(json.dumps(batch, cls=CommandEncoder, separators=(",", ":")))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+def _page(control):
+    """
+    Returns a page showing the control, with its serializing connection.
+    """
+    connection=_SerializingConnection()
+    page=ft.Page(connection, "benchmark", asyncio.new_event_loop())
+    page.add(control)
+    connection.sent_bytes=0
+    return page, connection
+
+
+def _measure(update, states):
+    """
+    Runs the update for every (round, entries) state and returns the latencies in milliseconds.
+    """
+    latencies=[]
+    for state in states:
+        start=time.perf_counter()
+        update(*state)
+        latencies.append((time.perf_counter()-start)*1000)
+    return latencies
+
+
+def main():
+    """
+    Prints the median and maximum update latency of both backends and the update message size.
+    """
+    base=_entries(11)
+    added=_entries(12)
+    states=[(i, added if i % 2 == 0 else base) for i in range(ROUNDS)]
+
+    graph.settings=RenderCacheSettings(cache_dir=tempfile.mkdtemp())
+    image=ft.Image(src=draw_graph(base, MONTHLY_CHARGE))
+    image_page, image_connection=_page(image)
+
+    def update_image(i, entries):
+        # a different monthly charge in every round keeps the render cache cold
+        image.src=draw_graph(entries, MONTHLY_CHARGE+i+1)
+        image_page.update()
+
+    plotly_latencies=_measure(update_image, states)
+
+    native=NativeGraph(MONTHLY_CHARGE)
+    native.sync(base)
+    chart_page, chart_connection=_page(native.chart)
+
+    def update_chart(_, entries):
+        native.sync(entries)
+        chart_page.update()
+
+    native_latencies=_measure(update_chart, states)
+
+    for name, latencies, connection in (("plotly png", plotly_latencies, image_connection),
+                                        ("flet chart", native_latencies, chart_connection)):
+        print(f"{name:>10}: median {statistics.median(latencies):8.2f} ms, max {max(latencies):8.2f} ms, "
+              f"{connection.sent_bytes/len(latencies):8.0f} B per update message")
+    print("Network transfer and the client repaint are not included; "
+          "the plotly client also has to load the PNG file.")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ RATES=[
         "D61d – Dvoutarifová sazba – Chata využívaná o víkendech"
     ]
 
+RATE_CODES=[rate.split()[0] for rate in RATES]
+
+DISTRIBUTORS=["EG.D", "PREdistribuce", "ČEZ Distribuce"]
+
 BREAKERS=[
         "Do 3×10 A do 1x25 A včetně", "Nad 3×10 A do 3x16 A včetně", "Nad 3×16 A do 3x20 A včetně", "Nad 3×20 A do 3x25 A včetně",
         "Nad 3×25 A do 3x32 A včetně", "Nad 3×32 A do 3x40 A včetně", "Nad 3×40 A do 3x50 A včetně", "Nad 3×50 A do 3x63 A včetně",
@@ -0,0 +1,65 @@
+"""
+Module with helpers for running view handlers without blocking the UI.
+
+Concurrency contract of the views:
+- handlers are async and run on the Flet event loop; scraping and writes of
+  scraped data run in worker threads via asyncio.to_thread, and graph export runs
+  on the background renderer thread, awaited through its future;
+- entry calculations are short and run on the event loop, and a view changes the
+  state store there without awaiting in between, so changes apply in click order;
+  the store's own write-behind runs on its timer thread under the store lock;
+- requests whose result only replaces what is shown (scraping, refreshing the
+  graph) are cancelled by a newer request, and their results are dropped; files
+  are written only by the request that finished, after its result arrived.
+"""
+
+import asyncio
+import flet as ft
+
+
+def ProgressIndicator():
+    """
+    Create a hidden progress indicator shown while a request is running.
+    """
+    return ft.ProgressRing(width=24, height=24, stroke_width=3, visible=False)
+
+
+class LatestRequest:
+    """
+    Runs handler requests so that only the latest one takes effect:
+    starting a request cancels the one still running.
+    The progress control is visible while a request is running.
+    """
+    def __init__(self, page: ft.Page, progress: ft.Control=None):
+        self.page=page
+        self.progress=progress
+        self._task=None
+
+    def _show_progress(self, visible: bool):
+        """
+        Shows or hides the progress control.
+        """
+        if self.progress is not None:
+            self.progress.visible=visible
+            self.page.update()
+
+    async def run(self, request, *args):
+        """
+        Awaits request(*args) as the latest request and returns its result,
+        or None when a newer request cancelled it.
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        task=asyncio.current_task()
+        self._task=task
+        self._show_progress(True)
+        try:
+            return await request(*args)
+        except asyncio.CancelledError:
+            if self._task is task:
+                raise
+            return None
+        finally:
+            if self._task is task:
+                self._task=None
+                self._show_progress(False)
@@ -4,7 +4,11 @@ and handles navigation events.
 """
 import os
 import flet as ft
-from src.storage import load_data
+from src.errors import InternalError
+from src.storage import compact_data
+from src.state import get_store
+from src.prefetch import start_prefetch
+from src.renderer import get_renderer
 from gui.views.start import home_view
 from gui.views.supplier import suppl_elect_view
 from gui.views.setup import distribut_view
@@ -12,6 +16,55 @@ from gui.views.result import result_view
 from gui.views.reset import reset_view
 
 
+def has_saved_state():
+    """
+    Checks whether a previous session left complete and valid data behind.
+    Files failing their checksum are treated as missing.
+    """
+    try:
+        if os.path.exists("data/graph_data.json"):
+            compact_data("data/graph_data.json")
+    except InternalError:
+        return False
+    store = get_store()
+    return bool(store.config) and bool(store.entries)
+
+
+class ViewCache:
+    """
+    Keeps built views alive and rebuilds a view only when the version of its input state changes.
+    A view reflects the version stored in its data attribute; views that change
+    the state themselves keep it up to date, so their own changes do not cause a rebuild.
+    """
+    def __init__(self, page: ft.Page, builders):
+        self.page=page
+        self.builders=builders
+        self._views={}
+
+    def get(self, route: str)->ft.View:
+        """
+        Returns the view of the route, building it when missing or out of date.
+        """
+        build, version=self.builders[route]
+        view=self._views.get(route)
+        if view is None or view.data!=version():
+            view=build(self.page)
+            if view.data is None:
+                view.data=version()
+            self._views[route]=view
+        return view
+
+
+def supplier_data_version():
+    """
+    Returns the modification time of the scraped supplier data, which the distributor form is built from.
+    """
+    try:
+        return os.stat("data/supplier_data.json").st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 def main(page: ft.Page):
     """
     Initializes the application page, sets up the theme,
@@ -19,24 +72,38 @@ def main(page: ft.Page):
     """
     page.title = "Energy calculator"
     page.theme_mode = "light"
+    start_prefetch()
+    get_renderer().start()
+
+    store = get_store()
+    views = ViewCache(page, {
+        "/": (home_view, lambda: 0),
+        "/supplier-electricity": (suppl_elect_view, lambda: store.version),
+        "/distributor": (distribut_view, lambda: (store.version, supplier_data_version())),
+        "/result": (result_view, lambda: store.version),
+        "/confirm-reset": (reset_view, lambda: 0)
+    })
+    overlays = {"/confirm-reset": "/result"}
 
     def route_change(_):
-        page.views.clear()
-        if page.route == "/":
-            page.views.append(home_view(page))
-        elif page.route == "/supplier-electricity":
-            page.views.append(suppl_elect_view(page))
-        elif page.route =="/distributor":
-            page.views.append(distribut_view(page))
-        elif page.route=="/result":
-            page.views.append(result_view(page))
-        elif page.route == "/confirm-reset":
-            page.views.append(reset_view(page))
+        if page.route in overlays:
+            stack = [views.get(overlays[page.route]), views.get(page.route)]
+        elif page.route in views.builders:
+            stack = [views.get(page.route)]
+        else:
+            return
+        if page.views[:] != stack:
+            page.views[:] = stack
         page.update()
 
+    def view_pop(_):
+        page.views.pop()
+        page.go(page.views[-1].route)
+
     page.on_route_change = route_change
+    page.on_view_pop = view_pop
 
-    if os.path.exists("data/calculate_data.json") and os.path.exists("data/graph_data.json") and load_data("data/calculate_data.json") and load_data("data/graph_data.json"):
+    if has_saved_state():
         page.go("/result")
     else:
         page.go("/")
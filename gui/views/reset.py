@@ -3,6 +3,7 @@ Module for displaying a confirmation dialog to reset user data
 """
 import flet as ft
 from src.storage import clear_file
+from src.state import get_store
 
 # @generated (partially) ChatGPT 4o
 def reset_view(page: ft.Page):
@@ -10,8 +11,7 @@ def reset_view(page: ft.Page):
     Builds a modal overlay view that asks the user for confirmation to reset data
     """
     def on_confirm(e):
-        clear_file("data/graph_data.json")
-        clear_file("data/calculate_data.json")
+        get_store().clear()
         clear_file("data/supplier_data.json")
         e.page.go("/supplier-electricity")
     return ft.View(
@@ -4,13 +4,17 @@ Includes logic for initial data loading, user input handling,
 calculations, and graphical display updates.
 """
 
+import asyncio
 import flet as ft
 from data.constants import CZECH_MONTHS
 from src.errors import ValidationError
-from src.calculate import calculate_tariff, recalculation, yearly_recalculation, TariffConfig
-from src.storage import load_data, save_data, save_data_append
-from src.graph import draw_graph
+from src import calculate, graph
+from src.calculate import compile_tariff, create_tariff_config, monthly_settlement_exact
+from src.state import get_store
+from src.graph import NativeGraph
+from src.renderer import get_renderer
 from src.utils import get_month_range, count_months
+from gui.components.tasks import LatestRequest, ProgressIndicator
 
 def format_diff_label(diff, label=None):
     """
@@ -29,24 +33,11 @@ def format_diff_label(diff, label=None):
         return label
     return ft.Text(value, color=color, size=20)
 
-def create_tariff_config(data):
-    """
-    Creates and returns a TariffConfig object using provided input data
-    """
-    return TariffConfig(
-        data["energy_price_per_kwh"],
-        data["fixed_supplier_fee"],
-        data["distribution_high_tariff"],
-        data["distribution_low_tariff"],
-        data["high_tariff_ratio"],
-        data["breaker_fee"]
-    )
-
-def init_graph_data():
+def init_graph_data(store):
     """
     Loads configuration, calculates monthly and total diffs, and stores initial monthly values to graph data.
     """
-    data = load_data("data/calculate_data.json")
+    data = store.config
     months_after = get_month_range(data["start"], data["end"] , CZECH_MONTHS, mark=2)
     months_before = get_month_range(data["end"], data["start"] , CZECH_MONTHS, mark=1)
 
@@ -56,47 +47,49 @@ def init_graph_data():
     count_before = count_months(data["end"], data["start"])
 
     config=create_tariff_config(data)
-    cost = calculate_tariff(count_before, int(value), config)
+    if calculate.EXACT_MONEY:
+        costs, diffs = monthly_settlement_exact(count_before, int(value), config, data["user_monthly_charge"])
+        month_costs = [c / 100 for c in costs]
+        month_diffs = [d / 100 for d in diffs]
+        diff = sum(diffs) / 100
+    else:
+        cost = compile_tariff(config).cost(count_before, int(value))
 
-    cost_per_month = cost / count_before
-    diff_per_month = round(data["user_monthly_charge"] - cost_per_month, 2)
-    diff = diff_per_month * count_before
+        cost_per_month = cost / count_before
+        diff_per_month = round(data["user_monthly_charge"] - cost_per_month, 2)
+        diff = diff_per_month * count_before
+        month_costs = [round(cost_per_month, 2)] * count_before
+        month_diffs = [diff_per_month] * count_before
 
     label = f"{start} - {end}: {value} kWH"
     diff_text = format_diff_label(diff)
 
-    for m in months_before:
+    results = []
+    for m, month_cost, month_diff in zip(months_before, month_costs, month_diffs):
         month_number = CZECH_MONTHS.index(m)
         result = {
             "month": m,
             "month_number": month_number,
             "kwh": value,
-            "diff": diff_per_month,
-            "cost": round(cost_per_month, 2),
+            "diff": month_diff,
+            "cost": month_cost,
             "source": "initial"
         }
-        save_data_append(result, "data/graph_data.json")
+        results.append(result)
+    store.append_entries(results)
     return label, diff_text, [months_after]
 
-def add_all_sources(display_column):
+def add_all_sources(display_column, aggregates):
     """
     Adds a summary row to display_column for every unique user source
     """
-    data = load_data("data/graph_data.json")
-    user_sources = []
-    for entry in data:
-        source = entry.get("source")
-        if source != "initial" and source not in user_sources:
-            user_sources.append(source)
-
-    for source in user_sources:
-        filtered=[entry for entry in data if entry["source"] == source]
-        if not filtered:
+    for source, totals in aggregates.sources.items():
+        if source == "initial":
             continue
-        total_cost = round(sum(entry["diff"] for entry in filtered), 2)
-        first_month = filtered[0]["month"]
-        last_month = filtered[-1]["month"]
-        kwh = filtered[0]["kwh"]
+        total_cost = round(totals["diff"], 2)
+        first_month = totals["months"][0]
+        last_month = totals["months"][-1]
+        kwh = totals["kwh"]
 
         if first_month == last_month:
             label_text = f"{first_month}: {kwh} kWH"
@@ -108,11 +101,10 @@ def add_all_sources(display_column):
 
         display_column.controls.append(ft.Row(controls=[month_label, diff_text], spacing=20))
 
-def init_saved_data():
+def init_saved_data(data):
     """
-    Initializes view data from previously saved entries in graph_data.json
+    Initializes view data from previously saved graph entries
     """
-    data=load_data("data/graph_data.json")
     initial_entries = [entry for entry in data if entry.get("source") == "initial"]
     first_month = initial_entries[0]["month"]
     last_month = initial_entries[-1]["month"]
@@ -125,33 +117,42 @@ def init_saved_data():
     months_after=get_month_range(data[-1]["month_number"]+2, data[0]["month_number"]+1 , CZECH_MONTHS, mark=2)
     return label, diff_text, [months_after]
 
-def process_kwh_entry(config, entered_months, value, user_monthly_charge, user_index):
+def process_kwh_entry(store, config, entered_months, value, user_monthly_charge, user_index):
     """
     Process a single kWh entry and calculate the cost and difference.
     """
-    cost = calculate_tariff(len(entered_months), int(value), config)
-    cost_per_month = cost / len(entered_months)
-
     if entered_months[0]==entered_months[-1]:
         month_label = ft.Text(f"{entered_months[0]}: {value} kWH", size=20, width=250)
     else:
         month_label = ft.Text(f"{entered_months[0]} - {entered_months[-1]}: {value} kWH", size=20, width=250)
 
-    diff = round(user_monthly_charge*len(entered_months) - cost, 2)
-    diff_per_month=round(user_monthly_charge-cost_per_month, 2)
+    if calculate.EXACT_MONEY:
+        costs, diffs = monthly_settlement_exact(len(entered_months), int(value), config, user_monthly_charge)
+        month_costs = [c / 100 for c in costs]
+        month_diffs = [d / 100 for d in diffs]
+        diff = sum(diffs) / 100
+    else:
+        cost = compile_tariff(config).cost(len(entered_months), int(value))
+        cost_per_month = cost / len(entered_months)
+        diff = round(user_monthly_charge*len(entered_months) - cost, 2)
+        diff_per_month=round(user_monthly_charge-cost_per_month, 2)
+        month_costs = [cost_per_month] * len(entered_months)
+        month_diffs = [diff_per_month] * len(entered_months)
     diff_text_new = format_diff_label(diff)
 
-    for m in entered_months:
+    results = []
+    for m, month_cost, month_diff in zip(entered_months, month_costs, month_diffs):
         month_number = CZECH_MONTHS.index(m)
         result = {
             "month": m,
             "month_number": month_number,
             "kwh": value,
-            "diff": diff_per_month,
-            "cost": cost_per_month,
+            "diff": month_diff,
+            "cost": month_cost,
             "source": user_index
         }
-        save_data_append(result, "data/graph_data.json")
+        results.append(result)
+    store.append_entries(results)
     return month_label, diff_text_new
 
 def result_view(page: ft.Page):
@@ -159,37 +160,70 @@ def result_view(page: ft.Page):
     Builds and returns the result view for analyzing electricity usage.
     Loads previously entered data, calculates monthly and yearly cost differences,
     and constructs a user interface with a graph, consumption inputs, and recalculation summaries.
+    Entries are changed on the event loop without awaiting, so clicks take effect in order;
+    the graph is rendered in the background and a newer change cancels the render of an older one.
+    The view data holds the store version the view reflects, for the router's view cache.
     """
-    if load_data("data/graph_data.json"):
-        label, diff_text, months_after = init_saved_data()
+    store = get_store()
+    if store.entries:
+        label, diff_text, months_after = init_saved_data(store.entries)
     else:
-        label, diff_text, months_after= init_graph_data()
+        label, diff_text, months_after= init_graph_data(store)
 
-    data = load_data("data/calculate_data.json")
+    data = store.config
 
     kwh_textfield = ft.TextField(width=150)
     display_column = ft.Column(controls=[], spacing=5, horizontal_alignment="start")
-    add_all_sources(display_column)
-    graph_img = ft.Image(src=draw_graph("data/graph_data.json", data["user_monthly_charge"]))
+    aggregates = store.aggregates()
+    add_all_sources(display_column, aggregates)
+    graph_progress = ProgressIndicator()
+    graph_refresh = LatestRequest(page, graph_progress)
+    if graph.GRAPH_BACKEND == "flet":
+        native_graph = NativeGraph(data["user_monthly_charge"])
+        native_graph.sync(store.entries)
+        graph_img = native_graph.chart
+    else:
+        native_graph = None
+        graph_img = ft.Image(visible=False)
 
     user_index = [0]
-    actual_recalculation = format_diff_label(round(recalculation("data/graph_data.json"), 2))
-    general_recalculation = format_diff_label(yearly_recalculation("data/graph_data.json"))
+    actual_recalculation = format_diff_label(round(aggregates.recalculation(), 2))
+    general_recalculation = format_diff_label(aggregates.yearly_recalculation())
     from_month_label = ft.Text(f"{months_after[0][0]} - " if months_after[0] else "✅ -", size=20)
     error_text = ft.Text("", color=ft.colors.RED)
     month_dropdown = ft.Dropdown(options=[ft.dropdown.Option(text=m, key=m) for m in months_after[0]], width=150)
 
+    async def render_graph():
+        """
+        Renders the graph of the current entries on the background renderer and shows it.
+        """
+        future = get_renderer().submit(list(store.entries), data["user_monthly_charge"])
+        graph_img.src = await asyncio.wrap_future(future)
+        graph_img.visible = True
+        page.update()
+
+    async def refresh_graph():
+        """
+        Shows the current entries in the graph.
+        """
+        if native_graph is not None:
+            native_graph.sync(store.entries)
+            page.update()
+        else:
+            await graph_refresh.run(render_graph)
+
     def update_view():
-        graph_img.src = draw_graph("data/graph_data.json", data["user_monthly_charge"])
-        actual_recalculation.value = format_diff_label(round(recalculation("data/graph_data.json"), 2)).value
-        general_recalculation.value = format_diff_label(yearly_recalculation("data/graph_data.json")).value
+        aggregates = store.aggregates()
+        actual_recalculation.value = format_diff_label(round(aggregates.recalculation(), 2)).value
+        general_recalculation.value = format_diff_label(aggregates.yearly_recalculation()).value
         month_dropdown.options = [ft.dropdown.Option(text=m, key=m) for m in months_after[0]]
         month_dropdown.value = ""
         from_month_label.value = f"{months_after[0][0]} - " if months_after[0] else "✅ -"
         month_dropdown.update()
+        view.data = store.version
         page.update()
 
-    def add_data():
+    async def add_data(_=None):
         """
         Handles the '+' button click.
         Adds a new monthly electricity entry: validates input, calculates cost,
@@ -215,7 +249,7 @@ def result_view(page: ft.Page):
             month_ind=months_after[0].index(selected_month)
 
             month_label, diff_text_new = process_kwh_entry(
-                config, months_after[0][:month_ind+1], value, data["user_monthly_charge"], user_index[0]
+                store, config, months_after[0][:month_ind+1], value, data["user_monthly_charge"], user_index[0]
             )
 
             months_after[0]=months_after[0][month_ind+1:]
@@ -228,24 +262,27 @@ def result_view(page: ft.Page):
         except ValidationError as e:
             error_text.value=str(e)
             page.update()
+            return
+        await refresh_graph()
 
-    def delete_data():
+    async def delete_data(_=None):
         """
         Handles the '-' button click.
         Deletes the last user-added monthly electricity entry: updates graph, recalculations, and UI.
         """
         try:
-            user_data = load_data("data/graph_data.json")
+            user_data = store.entries
 
             last_source = user_data[-1]["source"]
 
             if last_source == "initial":
                 raise ValidationError("⛔ Nelze odstranit počáteční záznamy")
 
-            while user_data and user_data[-1]["source"] == last_source:
-                user_data.pop()
+            count = len(user_data)
+            while count and user_data[count - 1]["source"] == last_source:
+                count -= 1
 
-            save_data(user_data, "data/graph_data.json")
+            store.truncate_entries(count)
 
             if display_column.controls:
                 display_column.controls.pop()
@@ -255,8 +292,13 @@ def result_view(page: ft.Page):
         except ValidationError as e:
             error_text.value = str(e)
             page.update()
+            return
+        await refresh_graph()
+
+    if native_graph is None:
+        page.run_task(refresh_graph)
 
-    return ft.View(
+    view = ft.View(
         route="/result",
         controls=[
             ft.Container(
@@ -299,7 +341,7 @@ def result_view(page: ft.Page):
                                                     text="+",
                                                     width=40,
                                                     height=40,
-                                                    on_click=lambda _: add_data(),
+                                                    on_click=add_data,
                                                     bgcolor="green",
                                                     color="white"
                                                 ),
@@ -307,7 +349,7 @@ def result_view(page: ft.Page):
                                                     text="-",
                                                     width=40,
                                                     height=40,
-                                                    on_click=lambda _: delete_data(),
+                                                    on_click=delete_data,
                                                     bgcolor="red",
                                                     color="white"
                                                 )
@@ -336,7 +378,7 @@ def result_view(page: ft.Page):
                                     height=700
                                 ),
                                 ft.Container(
-                                    content=graph_img,
+                                    content=ft.Stack([graph_img, graph_progress]),
                                     width=1000,
                                     height=700,
                                     alignment=ft.alignment.top_center
@@ -350,3 +392,4 @@ def result_view(page: ft.Page):
             )
         ]
     )
+    return view
@@ -5,14 +5,17 @@ estimated consumption, and monthly charge. After confirming the input, the data
 validated, enriched with additional pricing info, and stored for later calculation.
 """
 
+import asyncio
 from datetime import datetime
 from dataclasses import dataclass
 import flet as ft
 from data.constants import CZECH_MONTHS_N, BREAKERS, RATES, REGIONS
 from gui.components.button_group import BackButton, ContinueButton
-from src.storage import load_data, save_data
+from gui.components.tasks import LatestRequest, ProgressIndicator
+from src.storage import load_data
+from src.state import get_store
 from src.scraper import scrape_distributor, scrape_breaker
-from src.utils import to_float
+from src.utils import to_float, get_distributor, get_high_percentage
 from src.errors import ValidationError, InternalError
 
 # @generated (partially) ChatGPT 4o: dataclass FormInputs generated by tool, rest of the logic refactored manually
@@ -31,30 +34,6 @@ class FormInputs:
     kwh: ft.TextField
     month: ft.Dropdown
 
-def get_distributor(region: str):
-    """
-    Returns the electricity distributor based on the provided Czech region.
-    """
-    if region in ["Jihočeský kraj", "Jihomoravský kraj", "Vysočina", "Zlínský kraj"]:
-        return "EG.D"
-    if region == "Praha":
-        return "PREdistribuce"
-    return "ČEZ Distribuce"
-
-def get_high_percentage(tariff_code: str):
-    """
-    Returns an approximate percentage of electricity consumption that falls under the high tariff
-    for a given Czech electricity tariff code.
-    """
-    high_tariff_map = {
-        "D25d": 0.65,
-        "D26d": 0.60,
-        "D27d": 0.40,
-        "D57d": 0.15,
-        "D61d": 0.35,
-    }
-    return high_tariff_map.get(tariff_code, 1.0)
-
 def validate_input(inputs: FormInputs):
     """
     Validates user input from the form controls.
@@ -158,12 +137,17 @@ def distribut_view(page: ft.Page):
     kwh_textfield = ft.TextField(width=360)
 
     error_text = ft.Text("", color=ft.colors.RED)
+    progress = ProgressIndicator()
+    loading = LatestRequest(page, progress)
 
-    def on_confirm():
+    async def on_confirm(_):
         """
         Handles the 'Continue' button click.
         Checks the input, saves the result, and navigates to the page.
+        The distributor prices are scraped off the event loop; a repeated click
+        cancels the request still loading.
         """
+        error_text.value = ""
         try:
             inputs = FormInputs(
                 tariff=tariff_dropdown,
@@ -174,9 +158,10 @@ def distribut_view(page: ft.Page):
                 kwh=kwh_textfield,
                 month=end_dropdown
             )
-            result = prepare_calculate_data(inputs)
-            save_data(result, "data/calculate_data.json")
-            page.go("/result")
+            result = await loading.run(asyncio.to_thread, prepare_calculate_data, inputs)
+            if result is not None:
+                get_store().set_config(result)
+                page.go("/result")
         except ValidationError as e:
             error_text.value = str(e)
             page.update()
@@ -209,7 +194,8 @@ def distribut_view(page: ft.Page):
                 ],
                 alignment="center"
             ),
-            ContinueButton(lambda e: on_confirm()),
+            ContinueButton(on_confirm),
+            progress,
             error_text
         ],
         horizontal_alignment="center",
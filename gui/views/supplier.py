@@ -4,6 +4,7 @@ Includes logic for handling selection state,
 and scraping tariff data based on the chosen provider.
 """
 
+import asyncio
 import flet as ft
 from data.constants import SUPPLIERS
 from src.errors import InternalError
@@ -11,6 +12,7 @@ from src.scraper import scrape_supplier
 from src.storage import save_data
 from gui.components.button_group import BackButton, ContinueButton
 from gui.components.grid import build_grid
+from gui.components.tasks import LatestRequest, ProgressIndicator
 
 
 def suppl_elect_view(page: ft.Page)->ft.View:
@@ -20,22 +22,30 @@ def suppl_elect_view(page: ft.Page)->ft.View:
     """
     selected_supplier = {"index": -1}
     supplier_rows = build_grid(page, SUPPLIERS, selected_supplier)
+    progress = ProgressIndicator()
+    loading = LatestRequest(page, progress)
+    saving = asyncio.Lock()
 
-    def on_confirm():
+    async def on_confirm(_):
         """
         Handles the 'Continue' button click.
         Saves selected supplier and navigates to the next view,
         or shows a warning if none is selected.
+        The tariffs are scraped off the event loop; a repeated click cancels the request
+        still loading, and only the request that finishes saves its data.
         """
         index = selected_supplier["index"]
 
         if isinstance(index, int):
             supplier = SUPPLIERS[index]
             selected_name = supplier[0]
+            error_text.value = ""
             try:
-                data = scrape_supplier(supplier_link_text=selected_name)
-                save_data(data, "data/supplier_data.json")
-                page.go("/distributor")
+                data = await loading.run(asyncio.to_thread, scrape_supplier, selected_name)
+                if data is not None:
+                    async with saving:
+                        await asyncio.to_thread(save_data, data, "data/supplier_data.json")
+                    page.go("/distributor")
             except InternalError:
                 error_text.value = "⛔Nepodařilo se načíst data. Zkontrolujte připojení k internetu"
                 page.update()
@@ -57,7 +67,8 @@ def suppl_elect_view(page: ft.Page)->ft.View:
                 alignment="center",
                 spacing=15
             ),
-            ContinueButton(lambda e: on_confirm()),
+            ContinueButton(on_confirm),
+            progress,
             error_text,
         ],
         horizontal_alignment="center",
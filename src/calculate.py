@@ -2,11 +2,14 @@
 Module for calculating electricity costs and performing tariff-based recalculations.
 """
 
-from dataclasses import dataclass, field
-from src.storage import load_data
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+import numpy as np
+from src.columnar import GraphColumns
 from src.errors import InternalError
+from src.storage import load_records
 
-@dataclass
+@dataclass(frozen=True)
 class TariffConstants:
     """
     Fixed constants for electricity tariff calculation.
@@ -17,10 +20,11 @@ class TariffConstants:
     poze_per_mwh: float = 495
 
 
-@dataclass
+@dataclass(frozen=True)
 class TariffConfig:
     """
     Configuration data for electricity tariff calculations.
+    Configs are immutable and compare by value, so equal configs share a compiled tariff.
     """
     energy_price_per_kwh: float
     fixed_supplier_fee: float
@@ -30,36 +34,185 @@ class TariffConfig:
     breaker_fee: float
     constants: TariffConstants = field(default_factory=TariffConstants)
 
+def create_tariff_config(data):
+    """
+    Creates and returns a TariffConfig object using provided input data
+    """
+    return TariffConfig(
+        data["energy_price_per_kwh"],
+        data["fixed_supplier_fee"],
+        data["distribution_high_tariff"],
+        data["distribution_low_tariff"],
+        data["high_tariff_ratio"],
+        data["breaker_fee"]
+    )
+
 def fixed_fees(config: TariffConfig, month_count):
     """
     Calculates total fixed fees based on input values and month count.
     """
     return (config.fixed_supplier_fee+config.breaker_fee+config.constants.infrastructure_fee)*month_count
 
-def recalculation(file):
+def _load_graph_data(source):
+    """
+    Returns graph data given as columns, a list of entries or a path to the stored file.
+    """
+    if isinstance(source, GraphColumns):
+        if not source.rows:
+            raise InternalError("⚠️No records available")
+        return source
+    return load_records(source)
+
+def recalculation(source):
     """
-    Recalculates the total difference from stored graph data.
+    Recalculates the total difference from graph data,
+    given as columns, a list of entries or a path to the stored file.
     """
-    data=load_data(file)
-    if not data:
-        raise InternalError(f"⚠️File '{file}' is empty")
+    data=_load_graph_data(source)
+    if isinstance(data, GraphColumns):
+        return float(data.diff.sum())
     costs=[entry["diff"] for entry in data]
     result=sum(costs)
     return result
 
-def yearly_recalculation(file):
+def yearly_recalculation(source):
     """
     Estimates yearly cost based on average of current recalculated months.
     """
-    data=load_data(file)
-    if not data:
-        raise InternalError(f"⚠️File '{file}' is empty")
-    actual_recalculation=recalculation(file)
-    average_cost=actual_recalculation/len(data)
+    data=_load_graph_data(source)
+    actual_recalculation=recalculation(data)
+    count=data.rows if isinstance(data, GraphColumns) else len(data)
+    average_cost=actual_recalculation/count
     result=round(average_cost*12,2)
     return result
 
 
+class Aggregates:
+    """
+    Totals of graph entries computed in one pass: total diff and cost, entry count,
+    totals of every source and costs of every month.
+    Entries can be added and removed incrementally.
+    """
+    def __init__(self):
+        self.total_diff=0
+        self.total_cost=0
+        self.count=0
+        self.sources={}
+        self.month_costs={}
+
+    def reset(self):
+        """
+        Drops all entries from the aggregates.
+        """
+        self.total_diff=0
+        self.total_cost=0
+        self.count=0
+        self.sources={}
+        self.month_costs={}
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Builds the aggregates of the given entries.
+        """
+        aggregates=cls()
+        aggregates.add_entries(entries)
+        return aggregates
+
+    def add(self, entry):
+        """
+        Adds one entry to the aggregates. Only the diff of an entry is required.
+        """
+        cost=entry.get("cost", 0)
+        month=entry.get("month")
+        self.total_diff+=entry["diff"]
+        self.total_cost+=cost
+        self.count+=1
+        source=self.sources.setdefault(entry.get("source"), {"diff": 0, "cost": 0, "kwh": entry.get("kwh"), "months": []})
+        source["diff"]+=entry["diff"]
+        source["cost"]+=cost
+        source["months"].append(month)
+        self.month_costs[month]=self.month_costs.get(month, 0)+cost
+
+    def remove(self, entry):
+        """
+        Removes one previously added entry from the aggregates.
+        """
+        self.count-=1
+        if not self.count:
+            self.reset()
+            return
+        cost=entry.get("cost", 0)
+        month=entry.get("month")
+        self.total_diff-=entry["diff"]
+        self.total_cost-=cost
+        source=self.sources[entry.get("source")]
+        months=source["months"]
+        if months[-1]==month:
+            months.pop()
+        else:
+            months.remove(month)
+        if months:
+            source["diff"]-=entry["diff"]
+            source["cost"]-=cost
+        else:
+            del self.sources[entry.get("source")]
+        self.month_costs[month]-=cost
+
+    def add_entries(self, entries):
+        """
+        Adds every given entry.
+        """
+        for entry in entries:
+            self.add(entry)
+
+    def remove_entries(self, entries):
+        """
+        Removes every given entry.
+        """
+        for entry in entries:
+            self.remove(entry)
+
+    def to_dict(self):
+        """
+        Returns the aggregates as JSON-serializable data.
+        """
+        return {
+            "total_diff": self.total_diff,
+            "total_cost": self.total_cost,
+            "count": self.count,
+            "sources": [[source, totals] for source, totals in self.sources.items()],
+            "month_costs": self.month_costs
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restores aggregates saved with to_dict.
+        """
+        aggregates=cls()
+        aggregates.total_diff=data["total_diff"]
+        aggregates.total_cost=data["total_cost"]
+        aggregates.count=data["count"]
+        aggregates.sources=dict(data["sources"])
+        aggregates.month_costs=dict(data["month_costs"])
+        return aggregates
+
+    def recalculation(self):
+        """
+        Returns the total difference, like recalculation.
+        """
+        if not self.count:
+            raise InternalError("⚠️No records available")
+        return self.total_diff
+
+    def yearly_recalculation(self):
+        """
+        Returns the yearly estimate of the difference, like yearly_recalculation.
+        """
+        return round(self.recalculation()/self.count*12, 2)
+
+
 def calculate_tariff(month_count,
                      consumption_kwh,
                      config: TariffConfig
@@ -89,3 +242,240 @@ def calculate_tariff(month_count,
     else:
         total = (energy_cost + total_distribution + total_other + fixed_fees(config, month_count))*1.21
     return round(total,2)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTariff:
+    """
+    Tariff config reduced to coefficients of the cost, which is linear in consumption:
+    a variable price per kWh, regulated fees per MWh and fixed fees per month.
+    """
+    config: TariffConfig
+    variable_per_kwh: float
+    other_per_mwh: float
+    fixed_per_month: float
+
+    def cost(self, month_count, consumption_kwh):
+        """
+        Returns the same total as calculate_tariff with one multiply-add per component.
+        Amounts that land close to a rounding half are calculated step by step with calculate_tariff,
+        as the precomputed coefficients may differ from it in the last bits.
+        """
+        if consumption_kwh==0:
+            return 0
+        total_other=consumption_kwh*self.other_per_mwh/1000
+        total=(consumption_kwh*self.variable_per_kwh + round(total_other, 2) + self.fixed_per_month*month_count)*1.21
+        if abs(total_other*100%1-0.5) < 1e-6 or abs(total*100%1-0.5) < 1e-6:
+            return calculate_tariff(month_count, consumption_kwh, self.config)
+        return round(total, 2)
+
+
+@lru_cache(maxsize=128)
+def compile_tariff(config: TariffConfig):
+    """
+    Precomputes the cost coefficients of a config. Results are memoized by the config values.
+    """
+    constants=config.constants
+    distribution_per_mwh=(config.high_tariff_ratio*config.high_tariff_mwh
+                          +(1-config.high_tariff_ratio)*config.low_tariff_mwh)
+    return CompiledTariff(
+        config=config,
+        variable_per_kwh=config.energy_price_per_kwh+distribution_per_mwh/1000,
+        other_per_mwh=constants.tax_per_mwh+constants.system_services_per_mwh+constants.poze_per_mwh,
+        fixed_per_month=config.fixed_supplier_fee+config.breaker_fee+constants.infrastructure_fee
+    )
+
+def round_array(values, digits=2):
+    """
+    Rounds an array like the built-in round: np.round scales by a power of ten first,
+    so values close to a half are rounded again one by one with round.
+    A scalar gives a scalar.
+    """
+    values=np.asarray(values, dtype=np.float64)
+    shape=values.shape
+    values=np.atleast_1d(values)
+    rounded=np.round(values, digits)
+    scaled=values*10**digits
+    near_half=np.abs(scaled-np.floor(scaled)-0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half]=[round(value, digits) for value in values[near_half].tolist()]
+    return rounded.reshape(shape)[()]
+
+def stack_configs(configs):
+    """
+    Combines a list of configs into one config whose fields are arrays (one row per config).
+    """
+    constants=TariffConstants(**{
+        f.name: np.array([getattr(c.constants, f.name) for c in configs], dtype=np.float64)
+        for f in fields(TariffConstants)
+    })
+    return TariffConfig(**{
+        f.name: np.array([getattr(c, f.name) for c in configs], dtype=np.float64)
+        for f in fields(TariffConfig) if f.name!="constants"
+    }, constants=constants)
+
+def tariff_breakdown(month_count,
+                     consumption_kwh,
+                     config: TariffConfig
+                     ):
+    """
+    Returns the cost components of calculate_tariff_batch before VAT as a dictionary of arrays:
+    supplier energy, distribution, other regulated fees (rounded) and fixed fees.
+    """
+    consumption_kwh=np.asarray(consumption_kwh, dtype=np.float64)
+    month_count=np.asarray(month_count, dtype=np.float64)
+    consumption_mwh=consumption_kwh/1000
+    #supplier
+    energy_cost=consumption_kwh*config.energy_price_per_kwh
+
+    #distribution
+    high_tariff_cost=consumption_mwh*config.high_tariff_ratio*config.high_tariff_mwh
+    low_tariff_cost=consumption_mwh*(1-config.high_tariff_ratio)*config.low_tariff_mwh
+    total_distribution=high_tariff_cost+low_tariff_cost
+
+    #other
+    tax_cost=consumption_mwh*config.constants.tax_per_mwh
+    system_cost=consumption_mwh*config.constants.system_services_per_mwh
+    poze_cost=consumption_mwh*config.constants.poze_per_mwh
+    total_other=round_array(tax_cost+system_cost+poze_cost)
+
+    return {
+        "energy": energy_cost,
+        "distribution": total_distribution,
+        "other": total_other,
+        "fixed": fixed_fees(config, month_count)
+    }
+
+def calculate_tariff_batch(month_count,
+                           consumption_kwh,
+                           config: TariffConfig
+                           ):
+    """
+    Vectorized calculate_tariff over arrays of month counts and consumptions.
+    The config fields may be scalars or arrays (see stack_configs); all inputs are broadcast.
+    Returns an array of totals equal to calculate_tariff row by row.
+    """
+    return breakdown_total(tariff_breakdown(month_count, consumption_kwh, config), consumption_kwh)
+
+def breakdown_total(parts, consumption_kwh):
+    """
+    Returns the rounded totals with VAT of cost components from tariff_breakdown.
+    """
+    total=(parts["energy"] + parts["distribution"] + parts["other"] + parts["fixed"])*1.21
+    total=np.where(np.asarray(consumption_kwh)==0, 0, total)
+    return round_array(total)
+
+
+# Exact mode: money is kept in integer halers (1/100 Kč) and intermediate amounts
+# in 1e-10 Kč units, so rounding is deterministic half-up like on a supplier's bill.
+# Prices per kWh are exact to 4 decimals, prices per MWh, fees and the high tariff
+# ratio to 2 decimals. The int64 batch path holds consumptions up to 380 MWh.
+EXACT_MONEY=False
+KWH_PRICE_SCALE=10**4
+MWH_PRICE_SCALE=100
+RATIO_SCALE=100
+UNITS_PER_HALER=10**8
+
+def _to_units(value, scale):
+    """
+    Converts a decimal amount (a number or an array) to integer units of 1/scale.
+    """
+    if isinstance(value, np.ndarray):
+        return np.rint(value*scale).astype(np.int64)
+    return int(round(value*scale))
+
+def _div_half_up(numerator, denominator):
+    """
+    Divides integers rounding halves away from zero.
+    """
+    if isinstance(numerator, np.ndarray):
+        quotient=(np.abs(numerator)+denominator//2)//denominator
+        return np.where(numerator >= 0, quotient, -quotient)
+    quotient=(abs(numerator)+denominator//2)//denominator
+    return quotient if numerator >= 0 else -quotient
+
+def _exact_total(month_count, consumption_wh, config: TariffConfig):
+    """
+    Returns the total bill in halers from integer month counts and consumptions in Wh.
+    """
+    constants=config.constants
+    high_ratio=_to_units(config.high_tariff_ratio, RATIO_SCALE)
+    #supplier, in 1e-7 Kč
+    energy_cost=consumption_wh*_to_units(config.energy_price_per_kwh, KWH_PRICE_SCALE)
+    #distribution, in 1e-10 Kč
+    total_distribution=consumption_wh*(high_ratio*_to_units(config.high_tariff_mwh, MWH_PRICE_SCALE)
+                                       +(RATIO_SCALE-high_ratio)*_to_units(config.low_tariff_mwh, MWH_PRICE_SCALE))
+    #other, in 1e-8 Kč rounded to halers
+    other_per_mwh=sum(_to_units(value, MWH_PRICE_SCALE)
+                      for value in (constants.tax_per_mwh, constants.system_services_per_mwh, constants.poze_per_mwh))
+    total_other=_div_half_up(consumption_wh*other_per_mwh, 10**6)
+    fixed=_to_units(config.fixed_supplier_fee+config.breaker_fee+constants.infrastructure_fee, 100)*month_count
+
+    total=energy_cost*1000+total_distribution+(total_other+fixed)*UNITS_PER_HALER
+    total=_div_half_up(total*121, 100*UNITS_PER_HALER)
+    if isinstance(total, np.ndarray):
+        return np.where(consumption_wh==0, 0, total)
+    return 0 if consumption_wh==0 else total
+
+def calculate_tariff_exact(month_count,
+                           consumption_kwh,
+                           config: TariffConfig
+                           ):
+    """
+    Calculates the total electricity bill like calculate_tariff, in integer halers.
+    """
+    return _exact_total(int(month_count), int(round(consumption_kwh*1000)), config)
+
+def calculate_tariff_exact_batch(month_count,
+                                 consumption_kwh,
+                                 config: TariffConfig
+                                 ):
+    """
+    Vectorized calculate_tariff_exact over arrays; returns an int64 array of halers.
+    Config fields may be scalars or arrays (see stack_configs).
+    """
+    consumption_wh=np.rint(np.asarray(consumption_kwh, dtype=np.float64)*1000).astype(np.int64)
+    month_count=np.asarray(month_count, dtype=np.int64)
+    return _exact_total(month_count, consumption_wh, config)
+
+def split_halers(total: int, count: int):
+    """
+    Splits an amount in halers into count monthly parts that sum exactly to it;
+    the remainder goes to the first months.
+    """
+    base, remainder=divmod(total, count)
+    return [base+1 if i < remainder else base for i in range(count)]
+
+def monthly_settlement_exact(month_count, consumption_kwh, config: TariffConfig, monthly_charge):
+    """
+    Returns the cost and the difference to the monthly charge of every month in halers.
+    The monthly parts sum exactly to the billed cost and the total difference.
+    """
+    cost=calculate_tariff_exact(month_count, consumption_kwh, config)
+    diff=_to_units(monthly_charge, 100)*month_count-cost
+    return split_halers(cost, month_count), split_halers(diff, month_count)
+
+def rounding_report(month_count, consumption_kwh, config: TariffConfig, monthly_charge):
+    """
+    Compares the float calculation with the exact one for arrays of month counts and consumptions.
+    Returns the rows where the totals differ, and where the monthly differences of the
+    float path do not sum to its total difference, as dictionaries of amounts in Kč.
+    """
+    month_count, consumption_kwh=np.broadcast_arrays(np.asarray(month_count), np.asarray(consumption_kwh))
+    float_totals=calculate_tariff_batch(month_count, consumption_kwh, config)
+    exact_totals=calculate_tariff_exact_batch(month_count, consumption_kwh, config)
+
+    float_diff=round_array(monthly_charge*month_count-float_totals)
+    monthly_diffs=round_array(monthly_charge-float_totals/month_count)*month_count
+    drift=np.round(monthly_diffs-float_diff, 2)
+
+    report=[]
+    for i in np.flatnonzero((_to_units(float_totals, 100)!=exact_totals) | (drift!=0)).tolist():
+        report.append({
+            "month_count": int(month_count.flat[i]),
+            "consumption_kwh": float(consumption_kwh.flat[i]),
+            "float_total": float(float_totals.flat[i]),
+            "exact_total": int(exact_totals.flat[i])/100,
+            "monthly_drift": float(drift.flat[i])
+        })
+    return report
@@ -0,0 +1,190 @@
+"""
+Module providing the reusable HTTP client used by the scraper.
+The client keeps pooled keep-alive connections, negotiates compressed responses,
+retries transient failures with jittered backoff and collects transfer statistics.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+import requests
+from requests.adapters import HTTPAdapter
+
+# Brotli is only advertised when a decoder is installed (optional dependency)
+if find_spec("brotli") or find_spec("brotlicffi"):
+    ACCEPT_ENCODING="gzip, deflate, br"
+else:
+    ACCEPT_ENCODING="gzip, deflate"
+
+LATENCY_BUCKETS=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RETRY_STATUSES=(429, 500, 502, 503, 504)
+
+
+@dataclass
+class ClientSettings:
+    """
+    Configuration of the HTTP client.
+    """
+    connect_timeout: float = 3.05
+    read_timeout: float = 10
+    pool_connections: int = 4
+    max_connections_per_host: int = 2
+    retries: int = 2
+    backoff: float = 0.3
+    max_backoff: float = 5
+
+
+@dataclass
+class ClientStats:
+    """
+    Counters collected by the HTTP client.
+    """
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    bytes_received: int = 0
+    latency_buckets: list = field(default_factory=lambda: [0]*(len(LATENCY_BUCKETS)+1))
+    total_latency: float = 0
+
+
+def _wire_size(response):
+    """
+    Returns the size of the response body as received over the wire, before decompression.
+    """
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return int(response.headers.get("Content-Length", 0))
+
+
+class HttpClient:
+    """
+    HTTP client built on a pooled requests.Session.
+    """
+    def __init__(self, settings: ClientSettings=None):
+        self.settings=settings or ClientSettings()
+        self.stats=ClientStats()
+        self._lock=threading.Lock()
+        self._adapter=HTTPAdapter(
+            pool_connections=self.settings.pool_connections,
+            pool_maxsize=self.settings.max_connections_per_host,
+            pool_block=True
+        )
+        self.session=requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.session.headers["Accept-Encoding"]=ACCEPT_ENCODING
+
+    def _backoff(self, attempt: int):
+        """
+        Returns a random delay before the next attempt ("full jitter").
+        """
+        limit=min(self.settings.max_backoff, self.settings.backoff*2**attempt)
+        return random.uniform(0, limit)
+
+    def _record(self, latency: float, size: int):
+        """
+        Records one finished request in the statistics.
+        """
+        bucket=next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            self.stats.requests+=1
+            self.stats.bytes_received+=size
+            self.stats.total_latency+=latency
+            self.stats.latency_buckets[bucket]+=1
+
+    def get(self, url: str, headers=None, stream: bool=False):
+        """
+        Sends a GET request, retrying connection errors, timeouts and
+        temporary server errors. bytes_received counts compressed bytes as they
+        arrived; streamed bodies are not counted.
+        """
+        attempt=0
+        while True:
+            start=time.perf_counter()
+            try:
+                response=self.session.get(
+                    url,
+                    headers=headers,
+                    timeout=(self.settings.connect_timeout, self.settings.read_timeout),
+                    stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.settings.retries:
+                    with self._lock:
+                        self.stats.failures+=1
+                    raise
+            else:
+                size=0 if stream else _wire_size(response)
+                self._record(time.perf_counter()-start, size)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.settings.retries:
+                    return response
+                response.close()
+            with self._lock:
+                self.stats.retries+=1
+            time.sleep(self._backoff(attempt))
+            attempt+=1
+
+    def connection_counts(self):
+        """
+        Returns the number of opened connections and requests sent through the pools.
+        """
+        opened=0
+        sent=0
+        pools=self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool=pools.get(key)
+            if pool is not None:
+                opened+=pool.num_connections
+                sent+=pool.num_requests
+        return opened, sent
+
+    def report(self):
+        """
+        Returns the collected statistics as a dictionary.
+        """
+        opened, sent=self.connection_counts()
+        with self._lock:
+            return {
+                "requests": self.stats.requests,
+                "retries": self.stats.retries,
+                "failures": self.stats.failures,
+                "bytes_received": self.stats.bytes_received,
+                "connections_opened": opened,
+                "connections_reused": max(sent-opened, 0),
+                "average_latency": self.stats.total_latency/self.stats.requests if self.stats.requests else 0,
+                "latency_histogram": dict(zip([*map(str, LATENCY_BUCKETS), "inf"], self.stats.latency_buckets))
+            }
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self.session.close()
+
+
+_shared={"client": None}
+_client_lock=threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared HTTP client, creating it on first use.
+    """
+    with _client_lock:
+        if _shared["client"] is None:
+            _shared["client"]=HttpClient()
+        return _shared["client"]
+
+
+def configure_client(settings: ClientSettings):
+    """
+    Replaces the shared HTTP client with one using the given settings.
+    """
+    with _client_lock:
+        if _shared["client"] is not None:
+            _shared["client"].close()
+        _shared["client"]=HttpClient(settings)
+        return _shared["client"]
@@ -0,0 +1,117 @@
+"""
+Module for storing graph entries in a compact columnar binary format.
+The file starts with a 16-byte header (magic, version, row count) followed by
+fixed-width columns: kwh, cost and diff as float64, month_number and source as int32.
+Files are read through mmap and the columns are exposed as NumPy views without copying.
+"""
+
+import mmap
+import struct
+from dataclasses import dataclass
+import numpy as np
+from data.constants import CZECH_MONTHS
+from src.errors import InternalError
+from src.storage import save_bytes
+
+MAGIC=b"ECCC"
+VERSION=1
+HEADER=struct.Struct("<4sHxxQ")
+FLOAT_COLUMNS=("kwh", "cost", "diff")
+INT_COLUMNS=("month_number", "source")
+INITIAL_SOURCE=-1
+
+
+@dataclass(frozen=True)
+class GraphColumns:
+    """
+    Graph entries as NumPy columns. Source "initial" is stored as -1.
+    """
+    kwh: np.ndarray
+    cost: np.ndarray
+    diff: np.ndarray
+    month_number: np.ndarray
+    source: np.ndarray
+
+    @property
+    def rows(self):
+        """
+        Returns the number of entries.
+        """
+        return len(self.diff)
+
+    @property
+    def months(self):
+        """
+        Returns the Czech month names of the entries.
+        """
+        return [CZECH_MONTHS[number] for number in self.month_number.tolist()]
+
+    def to_entries(self):
+        """
+        Converts the columns back to a list of graph entry dictionaries.
+        """
+        return [
+            {
+                "month": CZECH_MONTHS[number],
+                "month_number": number,
+                "kwh": kwh,
+                "diff": diff,
+                "cost": cost,
+                "source": "initial" if source==INITIAL_SOURCE else source
+            }
+            for kwh, cost, diff, number, source in zip(
+                self.kwh.tolist(), self.cost.tolist(), self.diff.tolist(),
+                self.month_number.tolist(), self.source.tolist()
+            )
+        ]
+
+
+def to_columns(entries):
+    """
+    Converts a list of graph entry dictionaries to columns.
+    """
+    return GraphColumns(
+        kwh=np.array([float(entry["kwh"]) for entry in entries], dtype=np.float64),
+        cost=np.array([entry["cost"] for entry in entries], dtype=np.float64),
+        diff=np.array([entry["diff"] for entry in entries], dtype=np.float64),
+        month_number=np.array([entry["month_number"] for entry in entries], dtype=np.int32),
+        source=np.array([INITIAL_SOURCE if entry["source"]=="initial" else entry["source"] for entry in entries],
+                        dtype=np.int32)
+    )
+
+
+def write_columns(entries, file: str):
+    """
+    Writes graph entries (a list of dictionaries or GraphColumns) to a columnar file.
+    """
+    columns=entries if isinstance(entries, GraphColumns) else to_columns(entries)
+    parts=[HEADER.pack(MAGIC, VERSION, columns.rows)]
+    parts.extend(getattr(columns, name).astype("<f8").tobytes() for name in FLOAT_COLUMNS)
+    parts.extend(getattr(columns, name).astype("<i4").tobytes() for name in INT_COLUMNS)
+    save_bytes(b"".join(parts), file)
+
+
+def read_columns(file: str):
+    """
+    Maps a columnar file into memory and returns read-only NumPy views of its columns.
+    """
+    try:
+        with open(file, "rb") as f:
+            mapped=mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count=HEADER.unpack_from(mapped, 0)
+    except (OSError, ValueError, struct.error) as e:
+        raise InternalError("⚠️Error loading columnar file") from e
+    if magic!=MAGIC or version!=VERSION:
+        raise InternalError("⚠️Unsupported columnar file")
+    if len(mapped)!=HEADER.size+count*(8*len(FLOAT_COLUMNS)+4*len(INT_COLUMNS)):
+        raise InternalError("⚠️Columnar file is truncated")
+
+    offset=HEADER.size
+    columns={}
+    for name in FLOAT_COLUMNS:
+        columns[name]=np.frombuffer(mapped, dtype="<f8", count=count, offset=offset)
+        offset+=8*count
+    for name in INT_COLUMNS:
+        columns[name]=np.frombuffer(mapped, dtype="<i4", count=count, offset=offset)
+        offset+=4*count
+    return GraphColumns(**columns)
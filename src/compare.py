@@ -0,0 +1,91 @@
+"""
+Module for comparing the cost of every supplier tariff for one household.
+All tariffs of the catalogue are evaluated in one vectorized pass of
+the batch tariff calculation and returned ranked from the cheapest.
+"""
+
+import numpy as np
+from data.constants import SUPPLIERS
+from src.calculate import TariffConfig, tariff_breakdown, breakdown_total
+from src.errors import InternalError
+from src.scraper import supplier_index, find_supplier_tariffs, price_matrix
+from src.utils import to_float, get_distributor, get_high_percentage
+
+
+def tariff_catalogue(index, suppliers=None):
+    """
+    Collects the tariffs of the given suppliers (all known suppliers by default)
+    from the supplier index as (supplier, tariff name, price per kWh, monthly fee) rows.
+    Tariffs with prices that are not numbers are skipped.
+    """
+    suppliers=SUPPLIERS if suppliers is None else suppliers
+    catalogue=[]
+    for supplier, _ in suppliers:
+        for tariff in find_supplier_tariffs(index, supplier):
+            try:
+                price_kwh=to_float(tariff["price_kwh"])
+                price_month=to_float(tariff["price_month"])
+            except InternalError:
+                continue
+            catalogue.append((supplier, tariff["tariff_name"], price_kwh, price_month))
+    return catalogue
+
+
+def regulated_prices(matrix, rate_code: str, distributor: str, breaker: str):
+    """
+    Returns the high and low distribution prices and the breaker fee from the price matrix.
+    """
+    entry=matrix.get(rate_code, {}).get(distributor)
+    if not entry or not entry["distribution"]:
+        raise InternalError("⚠️No matching tariffs found")
+    breaker_fee=entry["breakers"].get(breaker)
+    if breaker_fee is None:
+        raise InternalError("⚠️No matching tariffs found")
+    high, low=entry["distribution"]
+    return to_float(high.split()[0]), to_float(low.split()[0]), to_float(breaker_fee)
+
+
+def compare_tariffs(consumption_kwh, month_count, rate: str, region: str, breaker: str,
+                    index=None, matrix=None, suppliers=None):
+    """
+    Calculates the cost of every tariff of the suppliers for the given consumption
+    over month_count months and returns them ranked from the cheapest.
+    Every result holds the supplier, tariff name, total and its components before VAT.
+    The supplier index and price matrix are scraped (and cached) when not given.
+    """
+    index=supplier_index() if index is None else index
+    matrix=price_matrix() if matrix is None else matrix
+    rate_code=rate.split()[0]
+    high_tariff_mwh, low_tariff_mwh, breaker_fee=regulated_prices(
+        matrix, rate_code, get_distributor(region), breaker
+    )
+
+    catalogue=tariff_catalogue(index, suppliers)
+    if not catalogue:
+        raise InternalError("⚠️No matching tariffs found")
+    config=TariffConfig(
+        energy_price_per_kwh=np.array([row[2] for row in catalogue]),
+        fixed_supplier_fee=np.array([row[3] for row in catalogue]),
+        high_tariff_mwh=high_tariff_mwh,
+        low_tariff_mwh=low_tariff_mwh,
+        high_tariff_ratio=get_high_percentage(rate_code),
+        breaker_fee=breaker_fee
+    )
+    consumption=np.full(len(catalogue), consumption_kwh, dtype=np.float64)
+    breakdown=tariff_breakdown(month_count, consumption, config)
+    totals=breakdown_total(breakdown, consumption)
+    parts={name: np.broadcast_to(values, totals.shape).tolist() for name, values in breakdown.items()}
+    totals_list=totals.tolist()
+
+    return [
+        {
+            "supplier": catalogue[i][0],
+            "tariff_name": catalogue[i][1],
+            "total": totals_list[i],
+            "energy": parts["energy"][i],
+            "distribution": parts["distribution"][i],
+            "other": parts["other"][i],
+            "fixed": parts["fixed"][i]
+        }
+        for i in np.argsort(totals, kind="stable").tolist()
+    ]
@@ -1,26 +1,103 @@
 """
-Module for drawing electricity cost graphs using Plotly
+Module for drawing electricity cost graphs using Plotly.
+Rendered images are kept in a content-addressed cache: a graph of the same
+data and layout is exported only once, and the least recently used images
+are evicted to keep the cache within its limits.
+The native backend draws the same graph as a Flet LineChart instead,
+whose points are updated in place when months are added or removed.
 """
 
-import tempfile
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+import flet as ft
 import plotly.graph_objects as go
-from src.storage import load_data
+from src.columnar import GraphColumns
 from src.errors import InternalError
+from src.storage import load_records, save_bytes
 
+LAYOUT={"template": "seaborn", "width": 1000, "height": 550}
+GRAPH_BACKEND="plotly"
 
-def draw_graph(file, monthly_charge):
+
+@dataclass
+class RenderCacheSettings:
     """
-    Draws a line graph comparing real monthly electricity costs
-    to the user's monthly charge using Plotly, and returns the path
-    to the temporary image file.
+    Runtime settings of the graph render cache.
+    """
+    cache_dir: str = "data/graphs"
+    max_files: int = 32
+    max_bytes: int = 16*1024*1024
+
+
+settings=RenderCacheSettings()
+_cache_lock=threading.Lock()
+
+
+def graph_data(source):
     """
-    data=load_data(file)
-    if not data:
-        raise InternalError(f"⚠️ File '{file}' is empty")
+    Returns the months, costs and diffs of graph data given as columns,
+    a list of entries or a path to the stored file.
+    """
+    if isinstance(source, GraphColumns):
+        if not source.rows:
+            raise InternalError("⚠️No records available")
+        return source.months, source.cost.tolist(), source.diff.tolist()
+    data=load_records(source)
     months = [entry["month"] for entry in data]
     costs = [entry["cost"] for entry in data]
     diffs = [entry["diff"] for entry in data]
+    return months, costs, diffs
+
+
+def render_key(months, costs, diffs, monthly_charge):
+    """
+    Returns the cache key of a graph: a hash of its data and layout.
+    """
+    payload=json.dumps([months, costs, diffs, monthly_charge, LAYOUT], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _evict(keep: str):
+    """
+    Removes the least recently used images until the cache fits its limits.
+    """
+    images=[]
+    for name in os.listdir(settings.cache_dir):
+        path=os.path.join(settings.cache_dir, name)
+        if name.endswith(".png") and path!=keep:
+            stat=os.stat(path)
+            images.append((stat.st_mtime, stat.st_size, path))
+    images.sort()
+    count=len(images)+1
+    size=sum(image[1] for image in images)+os.path.getsize(keep)
+    for _, image_size, path in images:
+        if count <= settings.max_files and size <= settings.max_bytes:
+            break
+        os.remove(path)
+        count-=1
+        size-=image_size
+
+
+def clear_render_cache():
+    """
+    Deletes all cached images.
+    """
+    with _cache_lock:
+        if not os.path.isdir(settings.cache_dir):
+            return
+        for name in os.listdir(settings.cache_dir):
+            if name.endswith(".png"):
+                os.remove(os.path.join(settings.cache_dir, name))
+
 
+def build_figure(months, costs, diffs, monthly_charge):
+    """
+    Builds a line graph comparing real monthly electricity costs
+    to the user's monthly charge.
+    """
     text = [f"{'+' if d >= 0 else ''}{d} Kč" for d in diffs]
     text_colors = ["green" if d >= 0 else "red" for d in diffs]
 
@@ -54,12 +131,91 @@ def draw_graph(file, monthly_charge):
         },
         xaxis_title="Měsíc",
         yaxis_title="Cena (Kč)",
-        template="seaborn",
-        width=1000,
-        height=550
+        **LAYOUT
     )
+    return fig
+
+
+def draw_graph(source, monthly_charge):
+    """
+    Draws a line graph comparing real monthly electricity costs
+    to the user's monthly charge using Plotly, and returns the path
+    to the image file. The graph data is given as columns,
+    a list of entries or a path to the stored file.
+    A cached image of the same data is returned without rendering.
+    """
+    months, costs, diffs=graph_data(source)
+    path=os.path.join(settings.cache_dir, f"{render_key(months, costs, diffs, monthly_charge)}.png")
+    with _cache_lock:
+        if os.path.isfile(path):
+            os.utime(path)
+            return path
+    image=build_figure(months, costs, diffs, monthly_charge).to_image(format="png")
+    with _cache_lock:
+        os.makedirs(settings.cache_dir, exist_ok=True)
+        save_bytes(image, path)
+        _evict(path)
+    return path
+
+
+def _diff_label(diff):
+    """
+    Returns the label of a monthly difference shown in the graph.
+    """
+    return f"{'+' if diff >= 0 else ''}{diff} Kč"
+
+
+class NativeGraph:
+    """
+    Cost graph drawn as a Flet LineChart: the monthly costs with their differences
+    as point tooltips and the monthly charge as a dashed line.
+    """
+    def __init__(self, monthly_charge):
+        self.monthly_charge=monthly_charge
+        self.cost_line=ft.LineChartData(data_points=[], color="black", stroke_width=2, point=True)
+        self.charge_line=ft.LineChartData(data_points=[], color="red", stroke_width=2, dash_pattern=[8, 4])
+        self.chart=ft.LineChart(
+            data_series=[self.cost_line, self.charge_line],
+            left_axis=ft.ChartAxis(title=ft.Text("Cena (Kč)"), labels_size=50),
+            bottom_axis=ft.ChartAxis(title=ft.Text("Měsíc"), labels=[], labels_size=30),
+            horizontal_grid_lines=ft.ChartGridLines(color="black12", width=1),
+            tooltip_bgcolor="white",
+            width=LAYOUT["width"],
+            height=LAYOUT["height"]
+        )
+
+    def _append(self, month, cost, diff):
+        """
+        Adds the points of one month.
+        """
+        x=len(self.cost_line.data_points)
+        self.cost_line.data_points.append(ft.LineChartDataPoint(
+            x, cost, tooltip=_diff_label(diff),
+            tooltip_style=ft.TextStyle(color="green" if diff >= 0 else "red")
+        ))
+        self.charge_line.data_points.append(ft.LineChartDataPoint(x, self.monthly_charge, show_tooltip=False))
+        self.chart.bottom_axis.labels.append(ft.ChartAxisLabel(value=x, label=ft.Text(month, size=12)))
+
+    def _truncate(self, count: int):
+        """
+        Removes the points of all months from the given position on.
+        """
+        del self.cost_line.data_points[count:]
+        del self.charge_line.data_points[count:]
+        del self.chart.bottom_axis.labels[count:]
 
-    # @generated (partially) ChatGPT 4o
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-        fig.write_image(tmp.name)
-        return tmp.name
+    def sync(self, source):
+        """
+        Updates the points to the graph data, given like for draw_graph.
+        Months added to or removed from the end of the data change only their own points.
+        """
+        months, costs, diffs=graph_data(source)
+        points=self.cost_line.data_points
+        common=0
+        for point, cost, diff in zip(points, costs, diffs):
+            if point.y!=cost or point.tooltip!=_diff_label(diff):
+                break
+            common+=1
+        self._truncate(common)
+        for month, cost, diff in zip(months[common:], costs[common:], diffs[common:]):
+            self._append(month, cost, diff)
@@ -0,0 +1,46 @@
+"""
+Module for prefetching tariff pages in the background when the application starts,
+so the supplier and distributor views find their data already in the scraper cache.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from src.errors import InternalError
+from src.scraper import supplier_index, price_matrix
+
+
+def _with_retries(task, retries: int, backoff: float):
+    """
+    Runs the task, retrying failed attempts with an exponentially growing delay.
+    Network failures are not retried here, as the HTTP client has already retried them.
+    """
+    for attempt in range(retries+1):
+        try:
+            return task()
+        except InternalError as e:
+            if attempt==retries or isinstance(e.__cause__, requests.RequestException):
+                raise
+            time.sleep(backoff*2**attempt)
+    return None
+
+
+def prefetch(tasks=None, max_workers: int=2, retries: int=3, backoff: float=0.5):
+    """
+    Fetches and parses the supplier and regulated-price pages in parallel.
+    Results land in the scraper cache; returns a list of flags telling which tasks succeeded.
+    """
+    tasks=tasks if tasks is not None else [supplier_index, price_matrix]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures=[pool.submit(_with_retries, task, retries, backoff) for task in tasks]
+    return [future.exception() is None for future in futures]
+
+
+def start_prefetch(**kwargs):
+    """
+    Starts prefetch on a daemon thread and returns the thread.
+    """
+    thread=threading.Thread(target=prefetch, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,182 @@
+"""
+Module running graph exports on a long-lived background renderer.
+The renderer keeps the Kaleido export process warm, takes render jobs from a
+queue on its own thread and hands the finished images back through callbacks,
+so the UI thread never waits for an export. A crashed export process is
+restarted and the job is tried again; at most max_restarts restarts are made
+within restart_window seconds, so a process that keeps crashing is not restarted
+in a loop, while occasional crashes over a long session are always recovered.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import plotly.graph_objects as go
+import plotly.io as pio
+from src.graph import draw_graph
+
+MAX_RESTARTS=3
+RESTART_WINDOW=600
+HEALTH_CHECK_INTERVAL=30
+
+
+class GraphRenderer:
+    """
+    Background renderer of cost graphs.
+    """
+    def __init__(self, render=draw_graph, scope=None, max_restarts: int=MAX_RESTARTS,
+                 health_check_interval: float=HEALTH_CHECK_INTERVAL, restart_window: float=RESTART_WINDOW):
+        self.render=render
+        self.scope=scope
+        self.max_restarts=max_restarts
+        self.health_check_interval=health_check_interval
+        self.restart_window=restart_window
+        self.restarts=0
+        self._restart_times=deque()
+        self.rendered=0
+        self._jobs=queue.Queue()
+        self._thread=None
+        self._lock=threading.Lock()
+
+    def _scope(self):
+        """
+        Returns the Kaleido scope used by Plotly for image export.
+        """
+        if self.scope is None:
+            self.scope=pio.kaleido.scope
+        return self.scope
+
+    def warm_up(self):
+        """
+        Starts the export process by rendering an empty figure.
+        """
+        self._scope().transform(go.Figure(), format="png", width=10, height=10)
+
+    def is_healthy(self):
+        """
+        Checks that the export process is running.
+        """
+        process=getattr(self._scope(), "_proc", None)  # kaleido keeps its subprocess in _proc
+        return process is not None and process.poll() is None
+
+    def restart(self):
+        """
+        Stops the export process and starts a new one.
+        """
+        self.restarts+=1
+        self._restart_times.append(time.monotonic())
+        self._scope()._shutdown_kaleido()  # pylint: disable=protected-access
+        self.warm_up()
+
+    def start(self):
+        """
+        Starts the renderer thread, which warms up the export process first.
+        Does nothing when the renderer is already running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread=threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Finishes the queued jobs and stops the renderer thread.
+        """
+        with self._lock:
+            thread=self._thread
+            self._thread=None
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+
+    def submit(self, source, monthly_charge, callback=None):
+        """
+        Queues a graph to be rendered and returns a Future of the image path.
+        The callback, if given, is called with the path from the renderer thread.
+        """
+        future=Future()
+        if callback is not None:
+            def deliver(done):
+                if not done.cancelled() and done.exception() is None:
+                    callback(done.result())
+            future.add_done_callback(deliver)
+        self.start()
+        self._jobs.put((source, monthly_charge, future))
+        return future
+
+    def _can_restart(self):
+        """
+        Checks that fewer than max_restarts restarts were made within the last restart_window seconds.
+        """
+        now=time.monotonic()
+        while self._restart_times and now-self._restart_times[0] >= self.restart_window:
+            self._restart_times.popleft()
+        return len(self._restart_times) < self.max_restarts
+
+    def check_health(self):
+        """
+        Restarts the export process if it is not running, up to max_restarts times within restart_window seconds.
+        Returns whether the process is running.
+        """
+        if self.is_healthy():
+            return True
+        if not self._can_restart():
+            return False
+        try:
+            self.restart()
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False  # the next job or check tries again
+        return self.is_healthy()
+
+    def _render(self, source, monthly_charge):
+        """
+        Renders one graph, restarting a crashed export process and trying again.
+        """
+        try:
+            return self.render(source, monthly_charge)
+        except Exception:  # pylint: disable=broad-exception-caught
+            if self.is_healthy() or not self.check_health():
+                raise
+            return self.render(source, monthly_charge)
+
+    def _run(self):
+        """
+        Renders queued jobs until stopped, checking the export process while idle.
+        """
+        try:
+            self.warm_up()
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass  # the first job retries the start of the process
+        while True:
+            try:
+                job=self._jobs.get(timeout=self.health_check_interval)
+            except queue.Empty:
+                self.check_health()
+                continue
+            if job is None:
+                break
+            source, monthly_charge, future=job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._render(source, monthly_charge))
+                self.rendered+=1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                future.set_exception(e)
+
+
+_shared={"renderer": None}
+_renderer_lock=threading.Lock()
+
+
+def get_renderer():
+    """
+    Returns the shared graph renderer, creating it on first use.
+    """
+    with _renderer_lock:
+        if _shared["renderer"] is None:
+            _shared["renderer"]=GraphRenderer()
+        return _shared["renderer"]
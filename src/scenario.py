@@ -0,0 +1,105 @@
+"""
+Module for what-if simulations of monthly advance payments.
+A sweep evaluates every combination of monthly advance, tariff and consumption
+growth factor against the consumption of the saved history and reports the
+expected year-end settlement (positive means a refund, negative a debt).
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields, replace
+import numpy as np
+from src.calculate import Aggregates, calculate_tariff_batch, create_tariff_config, stack_configs
+from src.errors import InternalError
+
+
+@dataclass
+class SweepResult:
+    """
+    Result of an advance payment sweep.
+    settlements has the shape (advances, tariffs, growth factors);
+    minimal_advance and yearly_cost have the shape (tariffs, growth factors).
+    """
+    advances: np.ndarray
+    growth_factors: np.ndarray
+    yearly_cost: np.ndarray
+    settlements: np.ndarray
+    minimal_advance: np.ndarray
+
+
+def yearly_consumption(entries):
+    """
+    Estimates the yearly consumption in kWh from the saved graph entries.
+    Every entry source holds the consumption of all its months.
+    """
+    aggregates=Aggregates.from_entries(entries)
+    if not aggregates.count:
+        raise InternalError("⚠️No records available")
+    total_kwh=sum(float(totals["kwh"]) for totals in aggregates.sources.values())
+    return total_kwh/aggregates.count*12
+
+
+def _as_column(config):
+    """
+    Reshapes the array fields of a stacked config to columns, so they broadcast against growth factors.
+    """
+    constants=replace(config.constants, **{
+        f.name: getattr(config.constants, f.name)[:, np.newaxis] for f in fields(config.constants)
+    })
+    return replace(config, constants=constants, **{
+        f.name: getattr(config, f.name)[:, np.newaxis] for f in fields(config) if f.name!="constants"
+    })
+
+
+def _sweep_chunk(advances, consumption, growth_factors, configs):
+    """
+    Evaluates the sweep for a chunk of tariffs; runs in a worker process for large grids.
+    """
+    config=_as_column(stack_configs(configs))
+    yearly_cost=calculate_tariff_batch(12, consumption*growth_factors[np.newaxis, :], config)
+    settlements=advances[:, np.newaxis, np.newaxis]*12-yearly_cost[np.newaxis, :, :]
+
+    no_debt=settlements >= 0
+    minimal_advance=np.where(no_debt.any(axis=0), advances[no_debt.argmax(axis=0)], np.nan)
+    return yearly_cost, settlements, minimal_advance
+
+
+def sweep_advances(entries, config, advances, growth_factors=(1.0,), tariffs=None, workers=None):
+    """
+    Sweeps monthly advances, tariffs and consumption growth factors for the saved history.
+    config is the saved calculation config; tariffs are alternative TariffConfigs
+    evaluated instead of the configured one. With workers set, tariffs are split
+    between that many processes.
+    """
+    advances=np.sort(np.asarray(advances, dtype=np.float64))
+    growth_factors=np.asarray(growth_factors, dtype=np.float64)
+    tariffs=list(tariffs) if tariffs else [create_tariff_config(config)]
+    consumption=yearly_consumption(entries)
+
+    if workers and workers > 1 and len(tariffs) > 1:
+        size=math.ceil(len(tariffs)/workers)
+        chunks=[tariffs[i:i+size] for i in range(0, len(tariffs), size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts=list(executor.map(
+                _sweep_chunk,
+                [advances]*len(chunks), [consumption]*len(chunks), [growth_factors]*len(chunks), chunks
+            ))
+    else:
+        parts=[_sweep_chunk(advances, consumption, growth_factors, tariffs)]
+
+    return SweepResult(
+        advances=advances,
+        growth_factors=growth_factors,
+        yearly_cost=np.concatenate([part[0] for part in parts]),
+        settlements=np.concatenate([part[1] for part in parts], axis=1),
+        minimal_advance=np.concatenate([part[2] for part in parts])
+    )
+
+
+def required_advance(entries, config, growth_factor: float=1.0):
+    """
+    Returns the smallest whole monthly advance in Kč that avoids a debt at the end of the year.
+    """
+    consumption=yearly_consumption(entries)*growth_factor
+    yearly_cost=calculate_tariff_batch(12, consumption, create_tariff_config(config))
+    return math.ceil(float(yearly_cost)/12)
@@ -4,26 +4,207 @@ Functions rely on BeautifulSoup for HTML parsing and are tailored
 to specific structure of the Ušetřeno.cz pricing tables.
 """
 
-from bs4 import BeautifulSoup
+import threading
+import time
+from concurrent.futures import Future
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
 import requests
+from data.constants import RATE_CODES, DISTRIBUTORS, BREAKERS
+from src.client import get_client
 from src.errors import InternalError
+from src.storage import load_data, save_data
+from src import snapshot
 
+SUPPLIER_URL="https://www.usetreno.cz/energie-elektrina/cena-elektriny/"
+REGULATED_URL="https://www.usetreno.cz/regulovane-ceny-elektriny-2023/"
+PAGE_TTL=600
+PRICE_MATRIX_FILE="data/price_matrix.json"
+STREAM_CHUNK_SIZE=16384
 
-def scrape_supplier(supplier_link_text: str, url: str="https://www.usetreno.cz/energie-elektrina/cena-elektriny/"):
+SUPPLIER_ROW_CLASS='MuiTableRow-root mui-1f7cxp9'
+TARIFF_NAME_CLASS='MuiTypography-root MuiTypography-body2 mui-i5he6i'
+
+# Only the elements the scrape functions read are built for the known pages
+_STRAINERS={
+    SUPPLIER_URL: SoupStrainer('tr', class_=SUPPLIER_ROW_CLASS),
+    REGULATED_URL: SoupStrainer(['h3', 'table'])
+}
+
+_page_cache={}
+_table_cache={}
+_in_flight={}
+_cache_lock=threading.Lock()
+
+
+def _conditional_get(url: str, meta=None):
     """
-    Scrapes electricity tariff data for a specific supplier from the given webpage.
+    Downloads the page at the given url, revalidating the stored snapshot
+    with If-None-Match/If-Modified-Since when its metadata is given.
+    Returns the HTML and whether it differs from the snapshot.
     """
+    headers={}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"]=meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"]=meta["last_modified"]
     try:
-        response = requests.get(url, timeout=10)
+        response = get_client().get(url, headers=headers)
+        if meta and response.status_code==304:
+            html=snapshot.load_html(url)
+            if html is not None:
+                snapshot.touch_snapshot(url)
+                return html, False
+            response = get_client().get(url)
         response.raise_for_status()
     except requests.RequestException as e:
         raise InternalError("⚠️Error while loading data from the server") from e
+    snapshot.save_snapshot(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return response.text, True
+
+
+_revalidating=set()
+
+
+def _revalidate_in_background(url: str, meta):
+    """
+    Refreshes a stale snapshot on a background thread.
+    A changed page is dropped from memory so the next lookup parses the new version.
+    """
+    with _cache_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def run():
+        try:
+            _, changed=_conditional_get(url, meta)
+            if changed:
+                with _cache_lock:
+                    _page_cache.pop(url, None)
+                    for key in [key for key in _table_cache if key[0]==url]:
+                        del _table_cache[key]
+        except InternalError:
+            pass
+        finally:
+            with _cache_lock:
+                _revalidating.discard(url)
 
-    soup = BeautifulSoup(response.text, 'lxml')
-    rows = soup.find_all('tr', class_='MuiTableRow-root mui-1f7cxp9')
-    results = []
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _use_snapshot(url: str, meta):
+    """
+    Decides whether the stored snapshot can be served right away,
+    starting a background refresh when it is stale.
+    """
+    if meta is None:
+        if snapshot.settings.offline:
+            raise InternalError("⚠️No saved data available offline")
+        return False
+    if snapshot.settings.offline or snapshot.is_fresh(meta):
+        return True
+    if snapshot.settings.stale_while_revalidate:
+        _revalidate_in_background(url, meta)
+        return True
+    return False
+
+
+def _download(url: str):
+    """
+    Returns the page at the given url parsed into a BeautifulSoup document,
+    preferring the on-disk snapshot according to the snapshot settings.
+    """
+    meta=snapshot.load_meta(url)
+    html=snapshot.load_html(url) if _use_snapshot(url, meta) else None
+    if html is None:
+        html, _=_conditional_get(url, meta)
+    return BeautifulSoup(html, 'lxml', parse_only=_STRAINERS.get(url))
+
+
+def _cached_table(url: str, name: str):
+    """
+    Returns a table extracted earlier from the snapshot of the given url,
+    or None when it has to be scraped again.
+    """
+    table=snapshot.load_table(url, name)
+    if table is None or not _use_snapshot(url, snapshot.load_meta(url)):
+        return None
+    return table
 
-    for row in rows:
+
+def fetch_page(url: str, ttl: float=PAGE_TTL):
+    """
+    Returns the parsed document for the given url.
+    A document younger than ttl seconds is served from memory, and concurrent
+    callers asking for the same url share one in-flight download.
+    """
+    with _cache_lock:
+        cached=_page_cache.get(url)
+        if cached and time.monotonic()-cached[0] < ttl:
+            return cached[1]
+        pending=_in_flight.get(url)
+        owner=pending is None
+        if owner:
+            pending=Future()
+            _in_flight[url]=pending
+
+    if not owner:
+        return pending.result()
+
+    try:
+        soup=_download(url)
+    except Exception as e:
+        with _cache_lock:
+            _in_flight.pop(url, None)
+        pending.set_exception(e)
+        raise
+
+    with _cache_lock:
+        _page_cache[url]=(time.monotonic(), soup)
+        _in_flight.pop(url, None)
+    pending.set_result(soup)
+    return soup
+
+
+def clear_page_cache():
+    """
+    Drops every parsed document and extracted table kept in memory.
+    """
+    with _cache_lock:
+        _page_cache.clear()
+        _table_cache.clear()
+
+
+def _scrape_cached(url: str, table_name: str, parse):
+    """
+    Runs the parse function over the page at the given url,
+    serving and storing its result in the memory and snapshot table caches.
+    """
+    with _cache_lock:
+        cached=_table_cache.get((url, table_name))
+    if cached and time.monotonic()-cached[0] < PAGE_TTL:
+        return cached[1]
+    result=_cached_table(url, table_name)
+    if result is None:
+        result=parse(fetch_page(url))
+        if result is not None:
+            snapshot.save_table(url, table_name, result)
+    if result is not None:
+        with _cache_lock:
+            _table_cache[(url, table_name)]=(time.monotonic(), result)
+    return result
+
+
+def build_supplier_index(soup):
+    """
+    Walks the supplier price page once and indexes every tariff row
+    by supplier link text and tariff name.
+    """
+    index={}
+
+    for row in soup.find_all('tr', class_=SUPPLIER_ROW_CLASS):
         cells = row.find_all('td')
         if len(cells) < 4:
             continue
@@ -32,11 +213,7 @@ def scrape_supplier(supplier_link_text: str, url: str="https://www.usetreno.cz/e
         if not link_elem:
             continue
 
-        link_text = link_elem.get_text(strip=True)
-        if supplier_link_text not in link_text:
-            continue
-
-        tariff_tag = cells[1].find('p', class_='MuiTypography-root MuiTypography-body2 mui-i5he6i')
+        tariff_tag = cells[1].find('p', class_=TARIFF_NAME_CLASS)
         if not tariff_tag:
             continue
 
@@ -48,25 +225,63 @@ def scrape_supplier(supplier_link_text: str, url: str="https://www.usetreno.cz/e
         if not price_elem_2:
             continue
 
-        result={
-            "tariff_name": tariff_tag.get_text(strip=True),
+        tariff_name=tariff_tag.get_text(strip=True)
+        index.setdefault(link_elem.get_text(strip=True), {})[tariff_name]={
+            "tariff_name": tariff_name,
             "price_kwh": price_elem_1.get_text(strip=True),
             "price_month": price_elem_2.get_text(strip=True)
         }
-        results.append(result)
+    return index
 
+
+def supplier_index(url: str=SUPPLIER_URL):
+    """
+    Returns the tariff index of all suppliers on the given page,
+    parsing the page at most once per cache period.
+    """
+    return _scrape_cached(url, "suppliers", build_supplier_index)
+
+
+def find_supplier_tariffs(index, supplier_link_text: str):
+    """
+    Returns the tariffs of a supplier from the index.
+    The link text is looked up directly and falls back to matching it
+    as a part of the supplier names on the page.
+    """
+    if supplier_link_text in index:
+        return list(index[supplier_link_text].values())
+    results=[]
+    for link_text, tariffs in index.items():
+        if supplier_link_text in link_text:
+            results.extend(tariffs.values())
+    return results
+
+
+def scrape_supplier(supplier_link_text: str, url: str=SUPPLIER_URL, soup=None):
+    """
+    Scrapes electricity tariff data for a specific supplier from the given webpage.
+    An already parsed document can be passed in as soup to skip the download.
+    """
+    index=build_supplier_index(soup) if soup is not None else supplier_index(url)
+    results=find_supplier_tariffs(index, supplier_link_text)
     if not results:
         raise InternalError("⚠️No matching tariffs found")
-
     return results
 
 
-def extract_price(table, distributor: str):
+def _table_rows(table):
     """
-    Extracts the distribution price for a given distributor from the provided HTML table.
+    Returns the stripped cell texts of every body row in the given HTML table.
+    """
+    return [[col.get_text(strip=True) for col in row.find_all('td')]
+            for row in table.find('tbody').find_all('tr')]
+
+
+def _distribution_price(rows, distributor: str):
+    """
+    Finds the distribution price for a given distributor in the rows of a price table.
     """
-    for row in table.find('tbody').find_all('tr'):
-        cols = [col.get_text(strip=True) for col in row.find_all('td')]
+    for cols in rows:
         if cols and distributor in cols[0]:
             if len(cols)==3:
                 result=''.join(cols[2].split()[:2])
@@ -74,63 +289,333 @@ def extract_price(table, distributor: str):
     return None
 
 
-def scrape_distributor(rate:str, distributor:str, url: str="https://www.usetreno.cz/regulovane-ceny-elektriny-2023/"):
+def _breaker_fee(head_cells, rows, distributor: str, breaker: str):
     """
-    Scrapes high and low distribution prices for a given tariff and distributor.
+    Finds the monthly fee for a given breaker and distributor in the rows of a breaker table.
     """
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        raise InternalError("⚠️Error while loading data from the server") from e
+    column=0
+    for head in head_cells:
+        if distributor in head:
+            break
+        column+=1
+
+    for cols in rows:
+        if cols and breaker in cols[0]:
+            return cols[column].split()[0]
+    return None
+
+
+def extract_price(table, distributor: str):
+    """
+    Extracts the distribution price for a given distributor from the provided HTML table.
+    """
+    return _distribution_price(_table_rows(table), distributor)
+
+
+def _distribution_headers(headings, rate: str):
+    """
+    Returns the distribution price headings belonging to the given rate.
+    """
+    return [tag for tag in headings if rate in tag.text and 'Cena za distribuci' in tag.text]
+
+
+def _breaker_header(headings, rate: str):
+    """
+    Returns the first breaker fee heading belonging to the given rate.
+    """
+    return next((tag for tag in headings if rate in tag.text and 'jistič' in tag.text), None)
+
 
-    soup = BeautifulSoup(response.text, 'lxml')
-    headers=soup.find_all(
-        lambda tag: tag.name == 'h3' and rate in tag.text and 'Cena za distribuci' in tag.text
-    )
-
-    result=[]
-    if len(headers)==2:
-        table_high=headers[0].find_next('table')
-        price_high=extract_price(table_high, distributor)
-        table_low=headers[1].find_next('table')
-        price_low=extract_price(table_low, distributor)
+def _heading_tables(headers):
+    """
+    Returns the rows of the first table following each of the first two headings.
+    """
+    return [_table_rows(header.find_next('table')) for header in headers[:2]]
+
+
+def _distribution_prices(tables, distributor: str):
+    """
+    Resolves the [high, low] distribution prices from the rate's price tables,
+    or returns None when they are incomplete.
+    """
+    if len(tables)==2:
+        price_high=_distribution_price(tables[0], distributor)
+        price_low=_distribution_price(tables[1], distributor)
         if price_high and price_low:
-            result=[price_high, price_low]
-    elif len(headers)==1:
-        table_high=headers[0].find_next('table')
-        price_high=extract_price(table_high, distributor)
+            return [price_high, price_low]
+    elif len(tables)==1:
+        price_high=_distribution_price(tables[0], distributor)
         if price_high:
-            result=[price_high, '0']
+            return [price_high, '0']
+    return None
+
+
+def _parse_distributor(soup, rate: str, distributor: str):
+    """
+    Finds the high and low distribution prices in a parsed regulated-prices page.
+    """
+    tables=_heading_tables(_distribution_headers(soup.find_all('h3'), rate))
+    result=_distribution_prices(tables, distributor)
     if not result:
         raise InternalError("⚠️No matching tariffs found")
     return result
 
 
-def scrape_breaker(rate:str, distributor:str, breaker:str, url:str="https://www.usetreno.cz/regulovane-ceny-elektriny-2023/"):
+def _parse_breaker(soup, rate: str, distributor: str, breaker: str):
+    """
+    Finds the monthly breaker fee in a parsed regulated-prices page.
+    """
+    header=_breaker_header(soup.find_all('h3'), rate)
+    table=header.find_next('table')
+    head_cells=[head.text for head in table.find('thead').find_all('th')]
+    return _breaker_fee(head_cells, _table_rows(table), distributor, breaker)
+
+
+def build_price_matrix(soup, rates=None, distributors=None, breakers=None):
+    """
+    Reads the regulated-prices page once and builds the full matrix of
+    distribution prices and breaker fees for every rate, distributor and breaker.
+    Missing prices are stored as None.
+    """
+    rates=RATE_CODES if rates is None else rates
+    distributors=DISTRIBUTORS if distributors is None else distributors
+    breakers=BREAKERS if breakers is None else breakers
+    headings=soup.find_all('h3')
+
+    matrix={}
+    for rate in rates:
+        tables=_heading_tables(_distribution_headers(headings, rate))
+        breaker_header=_breaker_header(headings, rate)
+        head_cells, breaker_rows=[], []
+        if breaker_header is not None:
+            breaker_table=breaker_header.find_next('table')
+            head_cells=[head.text for head in breaker_table.find('thead').find_all('th')]
+            breaker_rows=_table_rows(breaker_table)
+
+        matrix[rate]={}
+        for distributor in distributors:
+            has_column=any(distributor in head for head in head_cells)
+            matrix[rate][distributor]={
+                "distribution": _distribution_prices(tables, distributor),
+                "breakers": {
+                    breaker: _breaker_fee(head_cells, breaker_rows, distributor, breaker) if has_column else None
+                    for breaker in breakers
+                }
+            }
+    return matrix
+
+
+def price_matrix(url: str=REGULATED_URL):
+    """
+    Returns the regulated price matrix of the given page,
+    parsing the page at most once per cache period.
+    """
+    return _scrape_cached(url, "regulated", build_price_matrix)
+
+
+def save_price_matrix(matrix, file: str=PRICE_MATRIX_FILE):
+    """
+    Saves the price matrix into a compact JSON file for batch jobs.
+    """
+    save_data(matrix, file, compact=True)
+
+
+def load_price_matrix(file: str=PRICE_MATRIX_FILE):
+    """
+    Loads a price matrix saved by save_price_matrix.
+    """
+    return load_data(file)
+
+
+def scrape_distributor(rate:str, distributor:str, url: str=REGULATED_URL, soup=None):
+    """
+    Scrapes high and low distribution prices for a given tariff and distributor.
+    Known combinations are looked up in the price matrix; an already parsed
+    document can be passed in as soup to skip the download.
+    """
+    if soup is not None:
+        return _parse_distributor(soup, rate, distributor)
+    entry=price_matrix(url).get(rate, {}).get(distributor)
+    if entry is None:
+        return _scrape_cached(url, f"distributor:{rate}:{distributor}",
+                              lambda page: _parse_distributor(page, rate, distributor))
+    if not entry["distribution"]:
+        raise InternalError("⚠️No matching tariffs found")
+    return entry["distribution"]
+
+
+def scrape_breaker(rate:str, distributor:str, breaker:str, url:str=REGULATED_URL, soup=None):
     """
     Scrapes the monthly fee for a given breaker based on tariff and distributor.
+    Known combinations are looked up in the price matrix; an already parsed
+    document can be passed in as soup to skip the download.
+    """
+    if soup is not None:
+        return _parse_breaker(soup, rate, distributor, breaker)
+    breakers=price_matrix(url).get(rate, {}).get(distributor, {}).get("breakers", {})
+    if breaker in breakers:
+        return breakers[breaker]
+    return _scrape_cached(url, f"breaker:{rate}:{distributor}:{breaker}",
+                          lambda page: _parse_breaker(page, rate, distributor, breaker))
+
+
+def _stream_elements(url: str):
+    """
+    Streams the page at the given url through an incremental HTML parser
+    and yields every finished tr, h3 and table element.
+    Closing the generator stops reading the response.
     """
     try:
-        response = requests.get(url, timeout=10)
+        response = get_client().get(url, stream=True)
         response.raise_for_status()
     except requests.RequestException as e:
         raise InternalError("⚠️Error while loading data from the server") from e
 
-    soup = BeautifulSoup(response.text, 'lxml')
-    headers = soup.find(
-        lambda tag: tag.name == 'h3' and rate in tag.text and 'jistič' in tag.text
-    )
+    parser=etree.HTMLPullParser(events=("end",), tag=("tr", "h3", "table"),
+                                encoding=response.encoding or "utf-8")
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                yield element
+    except requests.RequestException as e:
+        raise InternalError("⚠️Error while loading data from the server") from e
+    finally:
+        response.close()
 
-    table=headers.find_next('table')
-    column=0
-    for head in table.find('thead').find_all('th'):
-        if distributor in head.text:
-            break
-        column+=1
 
-    for row in table.find('tbody').find_all('tr'):
-        cols = [col.get_text(strip=True) for col in row.find_all('td')]
-        if cols and breaker in cols[0]:
-            return cols[column].split()[0]
+def _element_text(element):
+    """
+    Returns the text of an lxml element stripped the same way as get_text(strip=True).
+    """
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def _element_rows(table):
+    """
+    Returns the stripped cell texts of every body row in the given lxml table.
+    """
+    return [[_element_text(col) for col in row.iter('td')]
+            for body in table.iter('tbody') for row in body.iter('tr')]
+
+
+def _find_child(element, tag: str, class_name=None):
+    """
+    Returns the first descendant with the given tag (and exact class), or None.
+    """
+    for child in element.iter(tag):
+        if class_name is None or child.get('class')==class_name:
+            return child
+    return None
+
+
+def _release(element):
+    """
+    Frees an already processed element together with its earlier siblings.
+    """
+    element.clear(keep_tail=True)
+    parent=element.getparent()
+    while parent is not None and element.getprevious() is not None:
+        del parent[0]
+
+
+def _element_tariff(row, supplier_link_text: str):
+    """
+    Reads a tariff from an lxml supplier table row, or returns None
+    when the row is incomplete or belongs to another supplier.
+    """
+    cells=list(row.iter('td'))
+    if len(cells) < 4:
+        return None
+    link_elem=_find_child(cells[1], 'a')
+    if link_elem is None or supplier_link_text not in _element_text(link_elem):
+        return None
+    tariff_tag=_find_child(cells[1], 'p', TARIFF_NAME_CLASS)
+    price_elem_1=_find_child(cells[2], 'b')
+    price_elem_2=_find_child(cells[3], 'b')
+    if tariff_tag is None or price_elem_1 is None or price_elem_2 is None:
+        return None
+    return {
+        "tariff_name": _element_text(tariff_tag),
+        "price_kwh": _element_text(price_elem_1),
+        "price_month": _element_text(price_elem_2)
+    }
+
+
+def stream_supplier(supplier_link_text: str, url: str=SUPPLIER_URL, limit=None):
+    """
+    Scrapes the tariffs of a specific supplier while the page is still downloading.
+    Rows are processed and released one by one; with a limit the download
+    stops as soon as that many tariffs have been collected.
+    """
+    results=[]
+    elements=_stream_elements(url)
+    try:
+        for element in elements:
+            if element.tag!='tr':
+                continue
+            if element.get('class')==SUPPLIER_ROW_CLASS:
+                result=_element_tariff(element, supplier_link_text)
+                if result:
+                    results.append(result)
+            _release(element)
+            if limit is not None and len(results) >= limit:
+                break
+    finally:
+        elements.close()
+
+    if not results:
+        raise InternalError("⚠️No matching tariffs found")
+    return results
+
+
+def stream_distributor(rate: str, distributor: str, url: str=REGULATED_URL):
+    """
+    Scrapes high and low distribution prices while the page is still downloading.
+    The download stops once both price tables of the rate have been read.
+    """
+    tables=[]
+    waiting=False
+    elements=_stream_elements(url)
+    try:
+        for element in elements:
+            if element.tag=='h3':
+                text=''.join(element.itertext())
+                if rate in text and 'Cena za distribuci' in text:
+                    waiting=True
+            elif element.tag=='table':
+                if waiting:
+                    tables.append(_element_rows(element))
+                    waiting=False
+                _release(element)
+                if len(tables)==2:
+                    break
+    finally:
+        elements.close()
+
+    result=_distribution_prices(tables, distributor)
+    if not result:
+        raise InternalError("⚠️No matching tariffs found")
+    return result
+
+
+def stream_breaker(rate: str, distributor: str, breaker: str, url: str=REGULATED_URL):
+    """
+    Scrapes the monthly breaker fee while the page is still downloading.
+    The download stops right after the breaker table of the rate has been read.
+    """
+    waiting=False
+    elements=_stream_elements(url)
+    try:
+        for element in elements:
+            if element.tag=='h3':
+                text=''.join(element.itertext())
+                waiting=waiting or (rate in text and 'jistič' in text)
+            elif element.tag=='table' and waiting:
+                head_cells=[''.join(head.itertext()) for head in element.iter('th')]
+                return _breaker_fee(head_cells, _element_rows(element), distributor, breaker)
+            elif element.tag=='table':
+                _release(element)
+    finally:
+        elements.close()
     return None
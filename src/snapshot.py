@@ -0,0 +1,151 @@
+"""
+Module for keeping on-disk snapshots of scraped pages.
+Every snapshot holds the raw HTML, the validators (ETag/Last-Modified) needed
+for conditional revalidation and the tariff tables extracted from that HTML.
+Writing a snapshot is best effort: a cache that cannot be written (read-only or
+full disk) never fails the download it belongs to.
+"""
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+from src.errors import InternalError
+from src.storage import load_data, save_data, save_text, delete_file
+
+
+@dataclass
+class SnapshotSettings:
+    """
+    Runtime settings of the snapshot cache.
+    Setting cache_dir to None disables the cache completely.
+    """
+    cache_dir: Optional[str] = "data/cache"
+    max_age: float = 24*3600
+    offline: bool = False
+    stale_while_revalidate: bool = True
+
+
+settings=SnapshotSettings()
+
+
+def _path(url: str, suffix: str):
+    """
+    Returns the path of a snapshot file for the given url.
+    """
+    key=hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(settings.cache_dir, f"{key}{suffix}")
+
+
+def _load_json(path: str):
+    """
+    Loads a JSON snapshot file, returning None when it does not exist.
+    """
+    if not os.path.isfile(path):
+        return None
+    return load_data(path) or None
+
+
+def load_meta(url: str):
+    """
+    Returns the snapshot metadata (validators and fetch time) for the given url, or None.
+    """
+    if settings.cache_dir is None:
+        return None
+    return _load_json(_path(url, ".json"))
+
+
+def load_html(url: str):
+    """
+    Returns the raw HTML of the snapshot for the given url, or None.
+    """
+    if settings.cache_dir is None or load_meta(url) is None:
+        return None
+    path=_path(url, ".html")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def is_fresh(meta):
+    """
+    Checks whether a snapshot is younger than the configured maximal age.
+    """
+    return time.time()-meta["fetched_at"] < settings.max_age
+
+
+def save_snapshot(url: str, html: str, etag=None, last_modified=None):
+    """
+    Stores the downloaded HTML together with its validators.
+    Tables extracted from a previous version of the page are dropped.
+    """
+    if settings.cache_dir is None:
+        return
+    try:
+        os.makedirs(settings.cache_dir, exist_ok=True)
+        save_text(html, _path(url, ".html"))
+        delete_file(_path(url, ".tables.json"))
+        save_data({
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time()
+        }, _path(url, ".json"))
+    except (OSError, InternalError):  # the page is still returned, only without a snapshot
+        try:
+            delete_file(_path(url, ".json"))
+        except OSError:
+            pass
+
+
+def touch_snapshot(url: str):
+    """
+    Marks the snapshot as fresh after the server confirmed it has not changed.
+    """
+    meta=load_meta(url)
+    if meta is None:
+        return
+    meta["fetched_at"]=time.time()
+    try:
+        save_data(meta, _path(url, ".json"))
+    except InternalError:  # the snapshot stays stale and is revalidated again
+        pass
+
+
+def load_table(url: str, name: str):
+    """
+    Returns a table previously extracted from the snapshot of the given url, or None.
+    """
+    if settings.cache_dir is None:
+        return None
+    tables=_load_json(_path(url, ".tables.json"))
+    if not tables:
+        return None
+    return tables.get(name)
+
+
+def save_table(url: str, name: str, table):
+    """
+    Stores a table extracted from the snapshot of the given url.
+    """
+    if load_meta(url) is None:
+        return
+    path=_path(url, ".tables.json")
+    tables=_load_json(path) or {}
+    tables[name]=table
+    try:
+        save_data(tables, path, compact=True)
+    except InternalError:  # the table is extracted from the HTML again next time
+        pass
+
+
+def clear_snapshots():
+    """
+    Removes every stored snapshot.
+    """
+    if settings.cache_dir is None or not os.path.isdir(settings.cache_dir):
+        return
+    for name in os.listdir(settings.cache_dir):
+        delete_file(os.path.join(settings.cache_dir, name))
@@ -0,0 +1,211 @@
+"""
+Module with an optional SQLite backend for the application state.
+Unlike the JSON files, which hold a single billing period, the database keeps
+monthly entries of many households over many billing periods and computes
+the aggregates of a period with indexed SQL.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import date
+from src.errors import InternalError
+
+SCHEMA="""
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    household TEXT NOT NULL,
+    period TEXT NOT NULL,
+    month_number INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    kwh NOT NULL,
+    cost REAL NOT NULL,
+    diff REAL NOT NULL,
+    source
+);
+CREATE INDEX IF NOT EXISTS entries_period ON entries (household, period, month_number);
+CREATE INDEX IF NOT EXISTS entries_source ON entries (household, period, source);
+CREATE TABLE IF NOT EXISTS configs (
+    household TEXT NOT NULL,
+    period TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (household, period)
+);
+CREATE TABLE IF NOT EXISTS current_periods (
+    household TEXT PRIMARY KEY,
+    period TEXT NOT NULL
+);
+"""
+
+COLUMNS=("month", "month_number", "kwh", "diff", "cost", "source")
+
+
+def billing_period(config, today: date=None):
+    """
+    Returns the billing period of a config as "YYYY-MM" of its start,
+    the month of the last bill, which is the latest such month not after today.
+    """
+    today=today if today is not None else date.today()
+    month=int(config["end"])
+    year=today.year if month <= today.month else today.year-1
+    return f"{year}-{month:02d}"
+
+
+class SqliteBackend:
+    """
+    Persistence of the application state in an SQLite database.
+    The backend works on one (household, billing period) at a time: the period given,
+    otherwise the current period of the household, which saving a config starts.
+    """
+    def __init__(self, path: str, household: str="default", period: str=None):
+        self.path=path
+        self.household=household
+        self._lock=threading.Lock()
+        self._connection=sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self.period=period if period is not None else self._current_period()
+
+    def _query(self, sql: str, params=()):
+        """
+        Runs a read query and returns all rows.
+        """
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _current_period(self):
+        """
+        Returns the stored current period of the household, or None.
+        """
+        rows=self._query("SELECT period FROM current_periods WHERE household=?", (self.household,))
+        return rows[0][0] if rows else None
+
+    def _period(self, household, period):
+        """
+        Returns the period parameters, defaulting to the backend's period.
+        """
+        return (household if household is not None else self.household,
+                period if period is not None else self.period)
+
+    def load_entries(self, household=None, period=None):
+        """
+        Returns the graph entries of a period in insertion order.
+        """
+        rows=self._query(
+            "SELECT month, month_number, kwh, diff, cost, source FROM entries "
+            "WHERE household=? AND period=? ORDER BY id",
+            self._period(household, period)
+        )
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def load_config(self, household=None, period=None):
+        """
+        Returns the config of a period, or None.
+        """
+        rows=self._query("SELECT data FROM configs WHERE household=? AND period=?", self._period(household, period))
+        return json.loads(rows[0][0]) if rows else None
+
+    def _insert(self, records):
+        """
+        Inserts graph entries of the current period; the caller holds the lock and transaction.
+        """
+        if self.period is None:
+            raise InternalError("⚠️No billing period has been started")
+        self._connection.executemany(
+            "INSERT INTO entries (household, period, month, month_number, kwh, diff, cost, source) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self.household, self.period, r["month"], r["month_number"], r["kwh"], r["diff"], r["cost"], r["source"])
+             for r in records]
+        )
+
+    def append_entries(self, records):
+        """
+        Appends graph entries to the current period in one transaction.
+        """
+        with self._lock, self._connection:
+            self._insert(records)
+
+    def replace_entries(self, records):
+        """
+        Replaces all graph entries of the current period in one transaction.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM entries WHERE household=? AND period=?", (self.household, self.period))
+            self._insert(records)
+
+    def save_config(self, config):
+        """
+        Stores the config and makes its billing period the current one, unless a period was given.
+        """
+        with self._lock, self._connection:
+            if self.period is None:
+                self.period=billing_period(config)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO configs (household, period, data) VALUES (?, ?, ?)",
+                (self.household, self.period, json.dumps(config, ensure_ascii=False))
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO current_periods (household, period) VALUES (?, ?)",
+                (self.household, self.period)
+            )
+
+    def clear(self):
+        """
+        Deletes the entries and config of the current period; the next saved config starts a new one.
+        """
+        with self._lock, self._connection:
+            params=(self.household, self.period)
+            self._connection.execute("DELETE FROM entries WHERE household=? AND period=?", params)
+            self._connection.execute("DELETE FROM configs WHERE household=? AND period=?", params)
+            self._connection.execute("DELETE FROM current_periods WHERE household=?", (self.household,))
+            self.period=None
+
+    def query_aggregates(self, household=None, period=None):
+        """
+        Returns the aggregates of a period's entries, in the form of Aggregates.to_dict,
+        with the totals summed by indexed SQL.
+        """
+        params=self._period(household, period)
+        total_diff, total_cost, count=self._query(
+            "SELECT SUM(diff), SUM(cost), COUNT(*) FROM entries WHERE household=? AND period=?", params
+        )[0]
+        if not count:
+            return {"total_diff": 0, "total_cost": 0, "count": 0, "sources": [], "month_costs": {}}
+        sources={
+            source: {"diff": diff, "cost": cost, "kwh": kwh, "months": []}
+            for source, diff, cost, kwh, _ in self._query(
+                "SELECT source, SUM(diff), SUM(cost), kwh, MIN(id) FROM entries "
+                "WHERE household=? AND period=? GROUP BY source ORDER BY MIN(id)",
+                params
+            )
+        }
+        for source, month in self._query(
+            "SELECT source, month FROM entries WHERE household=? AND period=? ORDER BY id", params
+        ):
+            sources[source]["months"].append(month)
+        month_costs=dict(self._query(
+            "SELECT month, SUM(cost) FROM entries WHERE household=? AND period=? GROUP BY month", params
+        ))
+        return {
+            "total_diff": total_diff,
+            "total_cost": total_cost,
+            "count": count,
+            "sources": [[source, totals] for source, totals in sources.items()],
+            "month_costs": month_costs
+        }
+
+    def period_history(self, household=None):
+        """
+        Returns (period, total cost, total difference, month count) for every stored period of a household.
+        """
+        return self._query(
+            "SELECT period, SUM(cost), SUM(diff), COUNT(*) FROM entries WHERE household=? "
+            "GROUP BY period ORDER BY period",
+            (household if household is not None else self.household,)
+        )
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,276 @@
+"""
+Module holding the in-process application state.
+The store owns the graph entries and the calculation config, serves every read
+from memory and persists changes in the background (write-behind): changes made
+within flush_delay seconds are coalesced into a single write.
+State is persisted by a backend: JSON files by default, or an SQLite database.
+Running aggregates of the entries are updated with every change and saved
+on exit together with the backend's stamp of the stored entries, so a restart
+does not have to scan the history again.
+The store methods are thread-safe, but the entries list is changed in place,
+so code running in worker threads must work on a copy of it.
+A background write that fails is logged and its changes stay pending,
+so they are written again with the next change or on exit.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+from src.calculate import Aggregates
+from src.errors import InternalError
+from src.storage import JsonBackend
+from src.sqlite_storage import SqliteBackend
+
+GRAPH_FILE="data/graph_data.json"
+CONFIG_FILE="data/calculate_data.json"
+AGGREGATES_FILE="data/graph_aggregates.json"
+SQLITE_FILE="data/history.db"
+STORAGE_BACKEND="json"
+
+logger=logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    In-memory store of graph entries and calculation config backed by a storage backend.
+    """
+    def __init__(self, backend=None, flush_delay: float=0.5):
+        self.backend=backend if backend is not None else JsonBackend(GRAPH_FILE, CONFIG_FILE, AGGREGATES_FILE)
+        self.flush_delay=flush_delay
+        self.version=0
+        self._lock=threading.RLock()
+        self._timer=None
+        self._entries=None
+        self._aggregates=None
+        self._aggregates_dirty=False
+        self._config=None
+        self._config_loaded=False
+        self._pending=[]
+        self._rewrite=False
+        self._config_dirty=False
+
+    @property
+    def entries(self):
+        """
+        Returns the graph entries. The list must not be modified by the caller.
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries=self.backend.load_entries()
+            return self._entries
+
+    @property
+    def config(self):
+        """
+        Returns the calculation config, or None when it has not been set up yet.
+        """
+        with self._lock:
+            if not self._config_loaded:
+                self._config=self.backend.load_config()
+                self._config_loaded=True
+            return self._config
+
+    def set_config(self, config):
+        """
+        Replaces the calculation config.
+        """
+        with self._lock:
+            self._config=config
+            self._config_loaded=True
+            self._config_dirty=True
+            self._changed()
+
+    def append_entries(self, records):
+        """
+        Appends graph entries.
+        """
+        with self._lock:
+            aggregates=self.aggregates()
+            self.entries.extend(records)
+            aggregates.add_entries(records)
+            self._aggregates_dirty=True
+            if not self._rewrite:
+                self._pending.extend(records)
+            self._changed()
+
+    def replace_entries(self, records):
+        """
+        Replaces all graph entries.
+        """
+        with self._lock:
+            self._entries=list(records)
+            self._aggregates=Aggregates.from_entries(self._entries)
+            self._aggregates_dirty=True
+            self._pending=[]
+            self._rewrite=True
+            self._changed()
+
+    def truncate_entries(self, count: int):
+        """
+        Keeps the first count graph entries and removes the rest.
+        """
+        with self._lock:
+            aggregates=self.aggregates()
+            removed=self.entries[count:]
+            del self.entries[count:]
+            aggregates.remove_entries(reversed(removed))
+            self._aggregates_dirty=True
+            self._pending=[]
+            self._rewrite=True
+            self._changed()
+
+    def aggregates(self):
+        """
+        Returns the running aggregates of the graph entries, which must not be modified by the caller.
+        Saved aggregates are used when they belong to the stored entries; otherwise they are computed once.
+        """
+        with self._lock:
+            if self._aggregates is None:
+                self._aggregates=self._load_aggregates()
+            return self._aggregates
+
+    def _load_aggregates(self):
+        """
+        Loads the saved aggregates if their stamp matches the stored entries, or computes them.
+        A backend computing aggregates itself (SQLite) is queried after pending changes are written.
+        """
+        if hasattr(self.backend, "query_aggregates"):
+            if self._pending or self._rewrite:
+                self.flush()
+            return Aggregates.from_dict(self.backend.query_aggregates())
+        entries=self.entries
+        if hasattr(self.backend, "load_aggregates") and entries and not (self._pending or self._rewrite):
+            saved=self.backend.load_aggregates()
+            stamp=self.backend.entries_stamp()
+            if isinstance(saved, dict) and stamp is not None and saved.get("stamp")==stamp:
+                return Aggregates.from_dict(saved.get("aggregates"))
+        self._aggregates_dirty=True
+        return Aggregates.from_entries(entries)
+
+    def _changed(self):
+        """
+        Bumps the state version and schedules a write unless one is already pending.
+        """
+        self.version+=1
+        if self._timer is None:
+            self._timer=threading.Timer(self.flush_delay, self._flush_in_background)
+            self._timer.daemon=True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        """
+        Cancels the scheduled write.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer=None
+
+    def _flush_in_background(self):
+        """
+        Runs a scheduled write. A failed write is logged instead of ending the timer thread,
+        and the changes it did not write stay pending for the next write.
+        """
+        try:
+            self.flush()
+        except (InternalError, sqlite3.Error):
+            logger.exception("⚠️Error writing the application state, retrying with the next change")
+
+    def flush(self):
+        """
+        Writes all pending changes to disk right away.
+        Changes are marked as written only after the backend stored them.
+        """
+        with self._lock:
+            self._cancel_timer()
+            if self._config_dirty:  # the config starts the billing period the entries belong to
+                self.backend.save_config(self._config)
+                self._config_dirty=False
+            if self._rewrite:
+                self.backend.replace_entries(self._entries)
+            elif self._pending:
+                self.backend.append_entries(self._pending)
+            self._pending=[]
+            self._rewrite=False
+
+    def save_aggregates(self):
+        """
+        Writes the aggregates of the written entries if they changed since they were loaded.
+        Only done on exit, so a flush stays a single write of the entries.
+        """
+        with self._lock:
+            if not self._aggregates_dirty or not self._entries or not hasattr(self.backend, "save_aggregates"):
+                return
+            if self._pending or self._rewrite:  # the stamp describes the written entries only
+                return
+            stamp=self.backend.entries_stamp()
+            if stamp is None:
+                return
+            self.backend.save_aggregates({
+                "stamp": stamp,
+                "aggregates": self._aggregates.to_dict()
+            })
+            self._aggregates_dirty=False
+
+    def close(self):
+        """
+        Writes pending changes and the aggregates; run when the interpreter exits.
+        """
+        with self._lock:
+            self.flush()
+            self.save_aggregates()
+
+    def invalidate(self):
+        """
+        Drops the in-memory state and pending writes; the next read loads the files again.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._entries=None
+            self._aggregates=None
+            self._aggregates_dirty=False
+            self._config=None
+            self._config_loaded=False
+            self._pending=[]
+            self._rewrite=False
+            self._config_dirty=False
+            self.version+=1
+
+    def clear(self):
+        """
+        Resets the state and clears the persisted data.
+        """
+        with self._lock:
+            self.invalidate()
+            self.backend.clear()
+
+    def recalculation(self):
+        """
+        Returns the total difference of the graph entries.
+        """
+        return self.aggregates().recalculation()
+
+    def yearly_recalculation(self):
+        """
+        Returns the yearly estimate of the difference of the graph entries.
+        """
+        return self.aggregates().yearly_recalculation()
+
+
+_shared={"store": None}
+_store_lock=threading.Lock()
+
+
+def get_store():
+    """
+    Returns the shared application store, creating it on first use.
+    Pending changes and the aggregates are written when the interpreter exits.
+    """
+    with _store_lock:
+        if _shared["store"] is None:
+            if STORAGE_BACKEND=="sqlite":
+                _shared["store"]=StateStore(SqliteBackend(SQLITE_FILE))
+            else:
+                _shared["store"]=StateStore()
+            atexit.register(_shared["store"].close)
+        return _shared["store"]
@@ -1,59 +1,341 @@
 """
 Module for reading and writing data to and from JSON files.
+Lists stored with save_data_append grow through an append-only log
+(one JSON record per line next to the file, followed by its CRC-32),
+which is merged into the JSON file by compaction. Whole files are replaced atomically and
+guarded by a SHA-256 checksum stored next to them.
 """
 
+import hashlib
 import json
 import os
+import tempfile
+import zlib
+from contextlib import contextmanager, nullcontext
 from src.errors import InternalError
 
-def load_data(file: str):
+try:
+    import fcntl
+except ImportError:  # file locking is not available on Windows
+    fcntl = None
+
+COMPACT_THRESHOLD_BYTES=64*1024
+
+def log_path(file: str):
+    """
+    Returns the path of the append-only log belonging to the given JSON file.
+    """
+    return f"{file}.log"
+
+def merging_log_path(file: str):
+    """
+    Returns the path the append log is moved to while it is being merged into the JSON file.
+    """
+    return f"{file}.log.merging"
+
+def checksum_path(file: str):
+    """
+    Returns the path of the checksum file belonging to the given JSON file.
+    """
+    return f"{file}.sha256"
+
+def corrupt_path(file: str):
+    """
+    Returns the path a file failing its checksum is moved to.
     """
-    Loads JSON data from the specified file path.
+    return f"{file}.corrupt"
+
+@contextmanager
+def file_lock(file: str):
+    """
+    Holds an exclusive lock of the given file for the duration of the block.
+    Writers that use the lock are serialised; on platforms without fcntl it does nothing.
     """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{file}.lock", "a", encoding="utf-8") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+def _fsync_dir(path: str):
+    """
+    Flushes the directory entry of a renamed file to disk where the platform allows it.
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd=os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
     try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def save_bytes(content: bytes, file: str):
+    """
+    Atomically replaces the given file with the content:
+    it is written to a temporary file, flushed to disk and renamed over the target.
+    """
+    directory=os.path.dirname(os.path.abspath(file))
+    fd, tmp=tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, file)
+    except BaseException:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(file)
+
+def save_text(text: str, file: str):
+    """
+    Atomically replaces the given file with the UTF-8 encoded text.
+    """
+    save_bytes(text.encode("utf-8"), file)
+
+def _digest(content: str):
+    """
+    Returns the SHA-256 digest of the file content.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _quarantine(file: str):
+    """
+    Moves a file failing its checksum aside together with its log and checksum,
+    so later appends start a new file instead of extending one that is never read.
+    """
+    for path in (file, log_path(file), merging_log_path(file), checksum_path(file)):
+        if os.path.isfile(path):
+            os.replace(path, corrupt_path(path))
+
+def _load_digests(file: str):
+    """
+    Returns the digests listed in the checksum file of the given file;
+    an empty list when there is no checksum.
+    """
+    path=checksum_path(file)
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().split()
+
+def _read_verified(file: str, attempts: int=5):
+    """
+    Reads the file content and checks it against its stored checksum, if there is one.
+    During a save the checksum file lists both the old and the new digest,
+    so a file interrupted at any point still verifies.
+    The file and its checksum are read without the writer's lock, so a mismatch is
+    read again: only a file failing twice with the same content and checksum is quarantined.
+    """
+    seen=None
+    for _ in range(attempts):
         with open(file, "r", encoding="utf-8") as f:
-            content=f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
-    except Exception as e:
+            raw=f.read()
+        digests=_load_digests(file)
+        if not digests or _digest(raw) in digests:
+            return raw
+        if seen==(raw, digests):
+            _quarantine(file)
+            raise InternalError("⚠️Checksum of JSON file does not match")
+        seen=(raw, digests)
+    raise InternalError("⚠️JSON file keeps changing while it is loaded")
+
+def _log_line(record):
+    """
+    Returns the log line of a record: its JSON and the CRC-32 of the JSON, separated by a tab.
+    """
+    line=json.dumps(record, ensure_ascii=False).encode("utf-8")
+    return line+f"\t{zlib.crc32(line):08x}\n".encode("ascii")
+
+def _load_log(path: str):
+    """
+    Loads the records appended to the given log.
+    A torn last line left by an interrupted append is skipped;
+    a complete line failing its checksum raises ValueError.
+    """
+    if not os.path.isfile(path):
+        return []
+    records=[]
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            content, _, crc=line[:-1].rpartition(b"\t")
+            if f"{zlib.crc32(content):08x}".encode("ascii")!=crc:
+                raise ValueError("Log line does not match its checksum")
+            records.append(json.loads(content.decode("utf-8")))
+    return records
+
+def _merge_pending(file: str, content: str):
+    """
+    Checks whether the log moved aside by an interrupted merge still holds records
+    missing from the file content. The merge writes the checksum file with the new
+    digest first, so the records are missing until the file content carries that digest.
+    """
+    if not os.path.isfile(merging_log_path(file)):
+        return False
+    digests=_load_digests(file)
+    return not digests or _digest(content)!=digests[0]
+
+def _cut_torn_tail(path: str):
+    """
+    Cuts off a torn last line of the log left by an interrupted append,
+    so the next record starts on a line of its own.
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, "rb+") as f:
+        content=f.read()
+        end=content.rfind(b"\n")+1
+        if end < len(content):
+            f.truncate(end)
+
+def load_data(file: str):
+    """
+    Loads JSON data from the specified file path,
+    including records appended to its log.
+    Raises InternalError when the content or a log line does not match its checksum;
+    the file is quarantined together with its log.
+    """
+    try:
+        raw=_read_verified(file)
+        content=raw.strip()
+        data=json.loads(content) if content else []
+    except (OSError, ValueError) as e:
+        raise InternalError("⚠️Error loading JSON file from") from e
+    try:
+        appended=_load_log(log_path(file))
+        if _merge_pending(file, raw):
+            appended=_load_log(merging_log_path(file))+appended
+    except ValueError as e:
+        _quarantine(file)
+        raise InternalError("⚠️Checksum of JSON log does not match") from e
+    except OSError as e:
         raise InternalError("⚠️Error loading JSON file from") from e
+    if appended:
+        data.extend(appended)
+    return data
 
-def save_data(data, file:str):
+def load_records(source):
+    """
+    Returns a list of records: a list is used as it is, a path is loaded from its JSON file.
+    Raises InternalError when there are no records.
+    """
+    data=source if isinstance(source, list) else load_data(source)
+    if not data:
+        if isinstance(source, str):
+            raise InternalError(f"⚠️File '{source}' is empty")
+        raise InternalError("⚠️No records available")
+    return data
+
+def _replace_file(content: str, file: str):
+    """
+    Atomically replaces the file content and its checksum and drops the append log.
+    The log is moved aside before the content is written and deleted only after it,
+    so records of a merge interrupted in between are read exactly once (see _merge_pending).
+    """
+    path=checksum_path(file)
+    old=""
+    if os.path.isfile(file):
+        with open(file, "r", encoding="utf-8") as f:
+            old=_digest(f.read())
+    new=_digest(content)
+    save_text(f"{new} {old}".strip(), path)
+    if os.path.isfile(log_path(file)):
+        os.replace(log_path(file), merging_log_path(file))
+    save_text(content, file)
+    if os.path.isfile(merging_log_path(file)):
+        os.remove(merging_log_path(file))
+    save_text(new, path)
+
+def save_data(data, file:str, compact: bool=False, lock: bool=False):
     """
     Saves the given data to a JSON file at the specified path.
+    A compact file is written without indentation and whitespace.
+    The file is replaced atomically, so an interrupted save leaves the previous content;
+    with lock set the write holds the file lock.
+    The file's append log is dropped, as the data replaces its content.
     """
     try:
-        with open(file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        if compact:
+            content=json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        else:
+            content=json.dumps(data, ensure_ascii=False, indent=4)
+        with file_lock(file) if lock else nullcontext():
+            _replace_file(content, file)
     except Exception as e:
         raise InternalError("⚠️Error saving JSON file") from e
 
-def save_data_append(new_result, file: str):
+def _holds_list(file: str):
     """
-    Appends a new result to a list of results in the given JSON file.
+    Checks by its first character that the file holds a JSON list,
+    creating an empty list file when it is missing or empty.
+    The checksum is verified when the file is loaded or compacted, not on every append.
     """
-    try:
-        try:
-            data=load_data(file)
-        except InternalError:
-            data = []
+    if os.path.isfile(file):
+        with open(file, "r", encoding="utf-8") as f:
+            head=f.read(64).lstrip()
+        if head:
+            return head.startswith("[")
+    save_data([], file)
+    return True
 
-        if not isinstance(data, list):
-            raise InternalError("⚠️JSON file does not contain a list")
+def save_data_batch(records, file: str, lock: bool=False):
+    """
+    Appends a list of results to the given JSON file with one write and one fsync.
+    The log is compacted once it grows over COMPACT_THRESHOLD_BYTES;
+    with lock set the write holds the file lock.
+    """
+    try:
+        with file_lock(file) if lock else nullcontext():
+            if os.path.isfile(merging_log_path(file)):  # finish a merge interrupted by a crash
+                compact_data(file)
+            if not _holds_list(file):
+                raise InternalError("⚠️JSON file does not contain a list")
+            if not records:
+                return
 
-        data.append(new_result)
-        save_data(data, file)
+            path=log_path(file)
+            _cut_torn_tail(path)
+            with open(path, "ab") as f:
+                f.write(b"".join(_log_line(record) for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.getsize(path) > COMPACT_THRESHOLD_BYTES:
+                try:
+                    compact_data(file)
+                except InternalError:  # the records are stored; a later append compacts the log
+                    pass
     except Exception as e:
         raise InternalError("⚠️Error saving JSON file") from e
 
+def save_data_append(new_result, file: str):
+    """
+    Appends a new result to a list of results in the given JSON file.
+    The record is written as one line of the append log without rewriting the file.
+    """
+    save_data_batch([new_result], file)
+
+def compact_data(file: str):
+    """
+    Merges the append log of the given file into the JSON file.
+    """
+    if os.path.isfile(log_path(file)) or os.path.isfile(merging_log_path(file)):
+        save_data(load_data(file), file)
+
 def delete_file(file: str):
     """
     Deletes the given file if it exists.
     Does nothing if the file does not exist.
     """
-    if os.path.isfile(file):
-        os.remove(file)
+    for path in (file, log_path(file), merging_log_path(file), checksum_path(file)):
+        if os.path.isfile(path):
+            os.remove(path)
 
 def clear_file(file: str):
     """
@@ -63,3 +345,93 @@ def clear_file(file: str):
     if os.path.isfile(file):
         with open(file, "w", encoding="utf-8") as f:
             f.truncate(0)
+    delete_file(log_path(file))
+    delete_file(checksum_path(file))
+
+class JsonBackend:
+    """
+    Persistence of the application state in two JSON files:
+    a list of graph entries and a calculation config.
+    Aggregates of the entries are kept in a third file when aggregates_file is set.
+    """
+    def __init__(self, graph_file: str, config_file: str, aggregates_file: str=None):
+        self.graph_file=graph_file
+        self.config_file=config_file
+        self.aggregates_file=aggregates_file
+
+    @staticmethod
+    def _load(file: str):
+        """
+        Loads a state file; a missing or unreadable file counts as empty.
+        """
+        try:
+            return load_data(file)
+        except InternalError:
+            return []
+
+    def load_entries(self):
+        """
+        Returns all stored graph entries.
+        """
+        return self._load(self.graph_file)
+
+    def load_config(self):
+        """
+        Returns the stored config, or None.
+        """
+        return self._load(self.config_file) or None
+
+    def append_entries(self, records):
+        """
+        Appends graph entries with one batched write.
+        """
+        save_data_batch(records, self.graph_file)
+
+    def replace_entries(self, records):
+        """
+        Replaces all graph entries.
+        """
+        save_data(records, self.graph_file)
+
+    def save_config(self, config):
+        """
+        Stores the config.
+        """
+        save_data(config, self.config_file)
+
+    def entries_stamp(self):
+        """
+        Returns a stamp of the stored entries, which changes with every write:
+        the checksum of the graph file and the size of its log.
+        Returns None when the file has no checksum or a save of it was interrupted.
+        """
+        digests=_load_digests(self.graph_file)
+        if len(digests)!=1 or os.path.isfile(merging_log_path(self.graph_file)):
+            return None
+        path=log_path(self.graph_file)
+        size=os.path.getsize(path) if os.path.isfile(path) else 0
+        return f"{digests[0]}:{size}"
+
+    def load_aggregates(self):
+        """
+        Returns the stored aggregates, or None.
+        """
+        if self.aggregates_file is None:
+            return None
+        return self._load(self.aggregates_file) or None
+
+    def save_aggregates(self, aggregates):
+        """
+        Stores the aggregates.
+        """
+        if self.aggregates_file is not None:
+            save_data(aggregates, self.aggregates_file, compact=True)
+
+    def clear(self):
+        """
+        Clears the stored entries, config and aggregates.
+        """
+        clear_file(self.graph_file)
+        clear_file(self.config_file)
+        if self.aggregates_file is not None:
+            delete_file(self.aggregates_file)
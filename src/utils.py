@@ -31,3 +31,27 @@ def to_float(value: str) :
         return float(value.replace(",", "."))
     except Exception as e:
         raise InternalError("⚠️Not a number") from e
+
+def get_distributor(region: str):
+    """
+    Returns the electricity distributor based on the provided Czech region.
+    """
+    if region in ["Jihočeský kraj", "Jihomoravský kraj", "Vysočina", "Zlínský kraj"]:
+        return "EG.D"
+    if region == "Praha":
+        return "PREdistribuce"
+    return "ČEZ Distribuce"
+
+def get_high_percentage(tariff_code: str):
+    """
+    Returns an approximate percentage of electricity consumption that falls under the high tariff
+    for a given Czech electricity tariff code.
+    """
+    high_tariff_map = {
+        "D25d": 0.65,
+        "D26d": 0.60,
+        "D27d": 0.40,
+        "D57d": 0.15,
+        "D61d": 0.35,
+    }
+    return high_tariff_map.get(tariff_code, 1.0)
@@ -4,8 +4,13 @@ Module for testing functions from calculate.py.
 
 import tempfile
 import os
+from dataclasses import FrozenInstanceError
 import pytest
-from src.calculate import yearly_recalculation, calculate_tariff, recalculation, fixed_fees, TariffConfig
+import numpy as np
+from src.calculate import (yearly_recalculation, calculate_tariff, recalculation, fixed_fees, TariffConfig,
+                           calculate_tariff_batch, stack_configs, round_array, Aggregates, compile_tariff,
+                           TariffConstants, calculate_tariff_exact, calculate_tariff_exact_batch,
+                           monthly_settlement_exact, split_halers, rounding_report)
 from src.errors import InternalError
 from src.storage import save_data_append, save_data
 
@@ -235,3 +240,187 @@ def test_end_to_end_calculation():
         assert yearly_result == 20 * 6
     finally:
         os.remove(tmp.name)
+
+
+def test_calculate_tariff_batch_matches_scalar():
+    """Test that the vectorized calculation agrees with calculate_tariff row by row."""
+    rng = np.random.default_rng(42)
+    consumptions = np.concatenate([[0, 1, 200, 300], rng.integers(0, 5000, 2000), rng.uniform(0, 5000, 2000).round(1)])
+    month_counts = rng.integers(1, 13, len(consumptions))
+    totals = calculate_tariff_batch(month_counts, consumptions, config)
+    expected = [calculate_tariff(int(m), float(c), config) for m, c in zip(month_counts, consumptions)]
+    assert totals.tolist() == expected
+
+
+def test_calculate_tariff_batch_with_stacked_configs():
+    """Test the vectorized calculation with a different config on every row."""
+    rng = np.random.default_rng(7)
+    configs = [
+        TariffConfig(
+            energy_price_per_kwh=round(rng.uniform(2, 7), 2),
+            fixed_supplier_fee=round(rng.uniform(0, 200), 2),
+            high_tariff_mwh=round(rng.uniform(500, 3000), 2),
+            low_tariff_mwh=round(rng.uniform(100, 600), 2),
+            high_tariff_ratio=float(rng.choice([1, 0.6, 0.4, 0.2])),
+            breaker_fee=round(rng.uniform(50, 500), 2)
+        )
+        for _ in range(500)
+    ]
+    consumptions = rng.integers(0, 3000, len(configs))
+    totals = calculate_tariff_batch(3, consumptions, stack_configs(configs))
+    expected = [calculate_tariff(3, int(c), conf) for c, conf in zip(consumptions, configs)]
+    assert totals.tolist() == expected
+
+
+def test_calculate_tariff_batch_zero_consumption():
+    """Test that zero consumption costs nothing in the vectorized calculation."""
+    assert calculate_tariff_batch([1, 12], [0, 0], config).tolist() == [0, 0]
+
+
+def test_round_array_matches_round():
+    """Test that array rounding agrees with the built-in round, including halves."""
+    values = np.array([0.125, 0.135, 2.675, 1.005, -0.125, 1.115, 10.0, 3.14159])
+    assert round_array(values).tolist() == [round(v, 2) for v in values.tolist()]
+
+
+def test_round_array_scalar_near_half():
+    """Test that a scalar close to a half is rounded like round and stays a scalar."""
+    assert round_array(2.675) == round(2.675, 2)
+    assert round_array(0.125) == round(0.125, 2)
+    assert np.ndim(round_array(0.125)) == 0
+    for consumption in range(2900, 3000):
+        assert calculate_tariff_batch(12, consumption, config) == calculate_tariff(12, consumption, config)
+
+
+ENTRIES = [
+    {"month": "leden", "month_number": 0, "kwh": 300, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "únor", "month_number": 1, "kwh": 300, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "březen", "month_number": 2, "kwh": 200, "diff": 20.0, "cost": 480.0, "source": 0},
+    {"month": "duben", "month_number": 3, "kwh": 150, "diff": 35.25, "cost": 464.75, "source": 1},
+    {"month": "květen", "month_number": 4, "kwh": 150, "diff": 35.25, "cost": 464.75, "source": 1},
+]
+
+
+def test_aggregates_match_recalculations():
+    """Test that the aggregates agree with recalculation and yearly_recalculation."""
+    aggregates = Aggregates.from_entries(ENTRIES)
+    assert aggregates.count == 5
+    assert aggregates.recalculation() == pytest.approx(recalculation(ENTRIES))
+    assert aggregates.yearly_recalculation() == yearly_recalculation(ENTRIES)
+    assert aggregates.total_cost == pytest.approx(2510.5)
+    assert aggregates.month_costs["duben"] == 464.75
+
+
+def test_aggregates_source_totals():
+    """Test the per-source totals in order of first entry."""
+    aggregates = Aggregates.from_entries(ENTRIES)
+    assert list(aggregates.sources) == ["initial", 0, 1]
+    assert aggregates.sources[1]["diff"] == 70.5
+    assert aggregates.sources[1]["months"] == ["duben", "květen"]
+    assert aggregates.sources[1]["kwh"] == 150
+
+
+def test_aggregates_incremental_updates():
+    """Test that adding and removing entries gives the same result as a full pass."""
+    aggregates = Aggregates.from_entries(ENTRIES[:2])
+    aggregates.add_entries(ENTRIES[2:])
+    aggregates.remove_entries(ENTRIES[3:])
+    expected = Aggregates.from_entries(ENTRIES[:3])
+    assert aggregates.count == expected.count
+    assert aggregates.recalculation() == pytest.approx(expected.recalculation())
+    assert list(aggregates.sources) == ["initial", 0]
+    assert aggregates.month_costs["duben"] == 0
+
+
+def test_aggregates_empty():
+    """Test that empty aggregates raise InternalError."""
+    aggregates = Aggregates.from_entries(ENTRIES[:1])
+    aggregates.remove(ENTRIES[0])
+    assert not aggregates.sources
+    with pytest.raises(InternalError):
+        aggregates.yearly_recalculation()
+
+
+def test_compiled_tariff_matches_calculate_tariff():
+    """Test that the compiled tariff gives the same totals as calculate_tariff."""
+    rng = np.random.default_rng(3)
+    for _ in range(2000):
+        tariff_config = TariffConfig(
+            energy_price_per_kwh=round(rng.uniform(2, 7), 2),
+            fixed_supplier_fee=round(rng.uniform(0, 200), 2),
+            high_tariff_mwh=round(rng.uniform(500, 3000), 2),
+            low_tariff_mwh=round(rng.uniform(100, 600), 2),
+            high_tariff_ratio=float(rng.choice([1, 0.65, 0.6, 0.4, 0.15, 0.35])),
+            breaker_fee=round(rng.uniform(50, 500), 2)
+        )
+        month_count = int(rng.integers(1, 13))
+        consumption = int(rng.integers(0, 5000))
+        assert compile_tariff(tariff_config).cost(month_count, consumption) == \
+            calculate_tariff(month_count, consumption, tariff_config)
+
+
+def test_compile_tariff_is_memoized():
+    """Test that equal configs share one compiled tariff."""
+    first = compile_tariff(TariffConfig(5.0, 100, 1000, 500, 0.5, 50))
+    assert compile_tariff(TariffConfig(5.0, 100, 1000, 500, 0.5, 50)) is first
+    assert first.cost(2, 200) == 1929.49
+    assert first.cost(1, 0) == 0
+
+
+def test_compiled_tariff_is_frozen():
+    """Test that configs and compiled tariffs cannot be modified."""
+    compiled = compile_tariff(config)
+    with pytest.raises(FrozenInstanceError):
+        config.breaker_fee = 0
+    with pytest.raises(FrozenInstanceError):
+        compiled.fixed_per_month = 0
+    assert not hasattr(compiled, "__dict__")
+
+
+def test_calculate_tariff_exact_basic():
+    """Test the exact calculation in halers."""
+    assert calculate_tariff_exact(2, 200, config) == 192949
+    assert calculate_tariff_exact(1, 0, config) == 0
+
+
+def test_calculate_tariff_exact_rounds_half_up():
+    """Test that halves are rounded up, unlike the float calculation."""
+    half_config = TariffConfig(0, 0.05, 0, 0, 1, 0, TariffConstants(0, 0, 0, 0))
+    assert calculate_tariff_exact(1, 1, half_config) == 6
+    assert calculate_tariff(1, 1, half_config) == 0.06
+
+
+def test_calculate_tariff_exact_batch_matches_scalar():
+    """Test that the int64 batch path agrees with the scalar exact calculation."""
+    rng = np.random.default_rng(5)
+    consumptions = rng.integers(0, 5000, 1000)
+    month_counts = rng.integers(1, 13, 1000)
+    totals = calculate_tariff_exact_batch(month_counts, consumptions, config)
+    assert totals.dtype == np.int64
+    assert totals.tolist() == [calculate_tariff_exact(int(m), int(c), config)
+                               for m, c in zip(month_counts, consumptions)]
+
+
+def test_calculate_tariff_exact_close_to_float():
+    """Test that the exact and float calculations differ only by rounding of halves."""
+    consumptions = np.arange(0, 5000)
+    exact = calculate_tariff_exact_batch(3, consumptions, config)
+    floats = calculate_tariff_batch(3, consumptions, config)
+    assert np.abs(exact - np.rint(floats * 100)).max() <= 2
+
+
+def test_monthly_settlement_exact_sums_to_total():
+    """Test that monthly parts sum exactly to the billed cost and difference."""
+    costs, diffs = monthly_settlement_exact(3, 700, config, 1500)
+    assert sum(costs) == calculate_tariff_exact(3, 700, config)
+    assert sum(diffs) == 1500 * 3 * 100 - sum(costs)
+    assert max(costs) - min(costs) <= 1
+    assert split_halers(-7, 3) == [-2, -2, -3]
+
+
+def test_rounding_report():
+    """Test that the report lists rows where the float path drifts from the exact one."""
+    report = rounding_report(3, np.arange(1, 200), config, 1500)
+    assert report
+    for row in report:
+        assert row["float_total"] != row["exact_total"] or row["monthly_drift"]
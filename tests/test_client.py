@@ -0,0 +1,84 @@
+"""
+Tests for the pooled HTTP client used by the scraper.
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+import pytest
+import requests
+from src.client import HttpClient, ClientSettings
+
+BODY = "<html><body>ceník</body></html>".encode("utf-8") * 50
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler answering every request with a gzip compressed page."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the compressed body when the client accepts gzip."""
+        body = BODY
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(BODY)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Silence request logging."""
+
+
+@pytest.fixture(name="server_url")
+def local_server():
+    """Runs a local HTTP server for the duration of a test."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GzipHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_reuses_connections(server_url):
+    """Test that consecutive requests share one keep-alive connection and are decompressed."""
+    client = HttpClient()
+    try:
+        for _ in range(3):
+            response = client.get(server_url)
+            assert response.content == BODY
+
+        report = client.report()
+        assert report["requests"] == 3
+        assert report["connections_opened"] == 1
+        assert report["connections_reused"] == 2
+        assert report["bytes_received"] == 3 * len(gzip.compress(BODY))
+        assert report["bytes_received"] < 3 * len(BODY)
+        assert sum(report["latency_histogram"].values()) == 3
+    finally:
+        client.close()
+
+
+def test_client_retries_server_errors():
+    """Test that temporary server errors are retried and the last response is returned."""
+    client = HttpClient(ClientSettings(retries=2, backoff=0))
+    failed = MagicMock(status_code=503, content=b"")
+    succeeded = MagicMock(status_code=200, content=b"ok")
+    with patch('requests.Session.get', side_effect=[failed, succeeded]) as mock_get:
+        assert client.get("https://example.com").content == b"ok"
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs["timeout"] == (3.05, 10)
+    assert client.report()["retries"] == 1
+
+
+def test_client_gives_up_on_connection_errors():
+    """Test that connection errors are raised after the configured retries."""
+    client = HttpClient(ClientSettings(retries=1, backoff=0))
+    with patch('requests.Session.get', side_effect=requests.ConnectionError("down")) as mock_get:
+        with pytest.raises(requests.ConnectionError):
+            client.get("https://example.com")
+    assert mock_get.call_count == 2
+    assert client.report()["failures"] == 1
@@ -0,0 +1,112 @@
+"""
+Tests for the columnar graph entry format.
+"""
+
+import os
+import tempfile
+import numpy as np
+import pytest
+from src.calculate import recalculation, yearly_recalculation
+from src.columnar import GraphColumns, read_columns, to_columns, write_columns
+from src.errors import InternalError
+from src.graph import graph_data
+
+ENTRIES = [
+    {"month": "leden", "month_number": 0, "kwh": 300.0, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "únor", "month_number": 1, "kwh": 300.0, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "březen", "month_number": 2, "kwh": 200.0, "diff": 20.0, "cost": 480.0, "source": 0},
+]
+
+
+def create_columnar_file(entries):
+    """Helper that writes the entries to a temporary columnar file."""
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".bin")
+    os.close(temp_fd)
+    write_columns(entries, temp_path)
+    return temp_path
+
+
+def test_round_trip():
+    """Test that written entries are read back unchanged."""
+    temp_path = create_columnar_file(ENTRIES)
+    try:
+        columns = read_columns(temp_path)
+        assert columns.rows == 3
+        assert columns.to_entries() == ENTRIES
+        assert columns.months == ["leden", "únor", "březen"]
+    finally:
+        os.remove(temp_path)
+
+
+def test_columns_are_zero_copy_views():
+    """Test that the columns are read-only views of the mapped file."""
+    temp_path = create_columnar_file(ENTRIES)
+    try:
+        columns = read_columns(temp_path)
+        assert columns.diff.dtype == np.float64
+        assert columns.source.dtype == np.int32
+        assert not columns.diff.flags.owndata
+        assert not columns.diff.flags.writeable
+    finally:
+        os.remove(temp_path)
+
+
+def test_file_size():
+    """Test that the file holds a 16-byte header and fixed-width columns."""
+    temp_path = create_columnar_file(ENTRIES)
+    try:
+        assert os.path.getsize(temp_path) == 16 + 3 * (3 * 8 + 2 * 4)
+    finally:
+        os.remove(temp_path)
+
+
+def test_empty_entries():
+    """Test writing and reading an empty series."""
+    temp_path = create_columnar_file([])
+    try:
+        assert read_columns(temp_path).rows == 0
+    finally:
+        os.remove(temp_path)
+
+
+def test_invalid_file():
+    """Test that a file with a wrong header raises InternalError."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".bin") as tmp:
+        tmp.write(b"not a columnar file")
+    try:
+        with pytest.raises(InternalError):
+            read_columns(tmp.name)
+    finally:
+        os.remove(tmp.name)
+
+
+def test_truncated_file():
+    """Test that a truncated file raises InternalError."""
+    temp_path = create_columnar_file(ENTRIES)
+    try:
+        with open(temp_path, "r+b") as f:
+            f.truncate(40)
+        with pytest.raises(InternalError):
+            read_columns(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+def test_recalculation_accepts_columns():
+    """Test that recalculations give the same results for columns and entries."""
+    columns = to_columns(ENTRIES)
+    assert isinstance(columns, GraphColumns)
+    assert recalculation(columns) == pytest.approx(recalculation(ENTRIES))
+    assert yearly_recalculation(columns) == yearly_recalculation(ENTRIES)
+
+
+def test_recalculation_empty_columns():
+    """Test that recalculation of empty columns raises InternalError."""
+    with pytest.raises(InternalError):
+        recalculation(to_columns([]))
+
+
+def test_graph_data_empty_columns():
+    """Test that graph data of empty columns raises InternalError."""
+    with pytest.raises(InternalError, match="⚠️No records available"):
+        graph_data(to_columns([]))
@@ -0,0 +1,90 @@
+"""
+Tests for the tariff comparison engine.
+"""
+
+import time
+import pytest
+from data.constants import SUPPLIERS, BREAKERS
+from src.calculate import calculate_tariff, TariffConfig
+from src.compare import compare_tariffs, tariff_catalogue
+from src.errors import InternalError
+
+RATE = "D25d – Dvoutarifová sazba – Elektrický bojler nebo akumulační vytápění"
+REGION = "Praha"
+BREAKER = BREAKERS[1]
+
+INDEX = {
+    "ČEZ": {
+        "Elektřina Standard": {"tariff_name": "Elektřina Standard", "price_kwh": "4,50", "price_month": "150"},
+        "Elektřina Fix": {"tariff_name": "Elektřina Fix", "price_kwh": "3,90", "price_month": "160"},
+    },
+    "MND": {
+        "MND Klasik": {"tariff_name": "MND Klasik", "price_kwh": "4,10", "price_month": "99"},
+        "MND Chybný": {"tariff_name": "MND Chybný", "price_kwh": "N/A", "price_month": "99"},
+    },
+    "Neznámý dodavatel": {
+        "Jiný": {"tariff_name": "Jiný", "price_kwh": "1,00", "price_month": "1"},
+    },
+}
+
+MATRIX = {
+    "D25d": {
+        "PREdistribuce": {
+            "distribution": ["2100,50 Kč/MWh", "300,25 Kč/MWh"],
+            "breakers": {BREAKER: "250,00"}
+        }
+    }
+}
+
+
+def test_tariff_catalogue_skips_invalid_prices():
+    """Test that only tariffs of known suppliers with numeric prices are collected."""
+    catalogue = tariff_catalogue(INDEX)
+    assert [row[1] for row in catalogue] == ["Elektřina Standard", "Elektřina Fix", "MND Klasik"]
+
+
+def test_compare_tariffs_ranked_and_matches_calculate_tariff():
+    """Test that the results are ranked and agree with calculate_tariff."""
+    results = compare_tariffs(2500, 12, RATE, REGION, BREAKER, index=INDEX, matrix=MATRIX)
+    totals = [result["total"] for result in results]
+    assert totals == sorted(totals)
+    for result in results:
+        tariff = INDEX[result["supplier"]][result["tariff_name"]]
+        config = TariffConfig(
+            energy_price_per_kwh=float(tariff["price_kwh"].replace(",", ".")),
+            fixed_supplier_fee=float(tariff["price_month"]),
+            high_tariff_mwh=2100.5,
+            low_tariff_mwh=300.25,
+            high_tariff_ratio=0.65,
+            breaker_fee=250
+        )
+        assert result["total"] == calculate_tariff(12, 2500, config)
+
+
+def test_compare_tariffs_breakdown():
+    """Test that the cost components add up to the total."""
+    result = compare_tariffs(1000, 6, RATE, REGION, BREAKER, index=INDEX, matrix=MATRIX)[0]
+    subtotal = result["energy"] + result["distribution"] + result["other"] + result["fixed"]
+    assert result["total"] == round(subtotal * 1.21, 2)
+
+
+def test_compare_tariffs_missing_prices():
+    """Test that a rate without regulated prices raises InternalError."""
+    with pytest.raises(InternalError):
+        compare_tariffs(1000, 12, "D01d – Jednotarifová sazba", REGION, BREAKER, index=INDEX, matrix=MATRIX)
+
+
+def test_compare_tariffs_full_catalogue_speed():
+    """Test that a large catalogue of every supplier is ranked well under 100 ms."""
+    index = {
+        name: {
+            f"Tarif {i}": {"tariff_name": f"Tarif {i}", "price_kwh": f"{3 + i / 100:.2f}", "price_month": str(50 + i)}
+            for i in range(100)
+        }
+        for name, _ in SUPPLIERS
+    }
+    start = time.perf_counter()
+    results = compare_tariffs(3000, 12, RATE, REGION, BREAKER, index=index, matrix=MATRIX)
+    elapsed = time.perf_counter() - start
+    assert len(results) == 100 * len(SUPPLIERS)
+    assert elapsed < 0.1
@@ -0,0 +1,86 @@
+"""
+Tests for drawing graphs and the render cache.
+"""
+
+import os
+import tempfile
+from unittest.mock import patch
+import pytest
+from src import graph
+from src.graph import draw_graph, render_key, clear_render_cache, RenderCacheSettings, NativeGraph
+
+ENTRIES = [
+    {"month": "leden", "month_number": 0, "kwh": 300, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "únor", "month_number": 1, "kwh": 300, "diff": 20.0, "cost": 480.0, "source": 0},
+]
+
+
+@pytest.fixture(name="cache_dir")
+def temporary_render_cache(monkeypatch):
+    """Redirects the render cache to a temporary directory."""
+    directory = tempfile.mkdtemp()
+    monkeypatch.setattr(graph, "settings", RenderCacheSettings(cache_dir=directory, max_files=2))
+    yield directory
+    clear_render_cache()
+    os.rmdir(directory)
+
+
+def test_draw_graph_writes_png(cache_dir):
+    """Test that the graph is rendered to a PNG file in the cache."""
+    path = draw_graph(ENTRIES, 500)
+    assert os.path.dirname(path) == cache_dir
+    with open(path, "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+def test_draw_graph_reuses_cached_image(cache_dir):
+    """Test that the same data is rendered only once."""
+    first = draw_graph(ENTRIES, 500)
+    with patch("plotly.graph_objects.Figure.to_image") as mock_render:
+        assert draw_graph(list(ENTRIES), 500) == first
+    mock_render.assert_not_called()
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_render_key_depends_on_inputs():
+    """Test that any change of the data or monthly charge changes the key."""
+    key = render_key(["leden"], [550.5], [-50.5], 500)
+    assert key == render_key(["leden"], [550.5], [-50.5], 500)
+    assert key != render_key(["leden"], [550.5], [-50.5], 600)
+    assert key != render_key(["leden"], [550.0], [-50.5], 500)
+
+
+def test_render_cache_evicts_least_recently_used(cache_dir):
+    """Test that the cache keeps at most max_files images, dropping the least recently used."""
+    with patch("plotly.graph_objects.Figure.to_image", return_value=b"png"):
+        first = draw_graph(ENTRIES, 100)
+        second = draw_graph(ENTRIES, 200)
+        os.utime(second, (1, 1))
+        os.utime(first, (2, 2))
+        third = draw_graph(ENTRIES, 300)
+    assert sorted(os.listdir(cache_dir)) == sorted([os.path.basename(first), os.path.basename(third)])
+
+
+def test_native_graph_draws_points():
+    """Test that the native chart has a cost point with its diff and a charge point for every month."""
+    native = NativeGraph(500)
+    native.sync(ENTRIES)
+    costs, charges = native.chart.data_series
+    assert [(point.x, point.y) for point in costs.data_points] == [(0, 550.5), (1, 480.0)]
+    assert [point.tooltip for point in costs.data_points] == ["-50.5 Kč", "+20.0 Kč"]
+    assert [point.y for point in charges.data_points] == [500, 500]
+    assert charges.dash_pattern
+    assert [label.label.value for label in native.chart.bottom_axis.labels] == ["leden", "únor"]
+
+
+def test_native_graph_updates_points_in_place():
+    """Test that adding or removing a month keeps the points of the other months."""
+    native = NativeGraph(500)
+    native.sync(ENTRIES[:1])
+    first = native.cost_line.data_points[0]
+    native.sync(ENTRIES)
+    assert native.cost_line.data_points[0] is first
+    assert len(native.cost_line.data_points) == 2
+    native.sync(ENTRIES[:1])
+    assert native.cost_line.data_points == [first]
+    assert len(native.charge_line.data_points) == 1
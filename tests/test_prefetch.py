@@ -0,0 +1,56 @@
+"""
+Tests for the background prefetch of tariff pages.
+"""
+
+from unittest.mock import MagicMock, patch
+import requests
+from src.errors import InternalError
+from src.prefetch import prefetch, start_prefetch
+
+
+def test_prefetch_runs_all_tasks():
+    """Test that every prefetch task runs and reports success."""
+    task1 = MagicMock(return_value={})
+    task2 = MagicMock(return_value={})
+
+    assert prefetch([task1, task2]) == [True, True]
+    task1.assert_called_once()
+    task2.assert_called_once()
+
+
+def test_prefetch_retries_with_backoff():
+    """Test that a failing task is retried with growing delays."""
+    task = MagicMock(side_effect=[InternalError("⚠️Error"), InternalError("⚠️Error"), {}])
+    with patch('src.prefetch.time.sleep') as mock_sleep:
+        assert prefetch([task], retries=3, backoff=0.5) == [True]
+    assert task.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+
+
+def test_prefetch_gives_up_after_retries():
+    """Test that a task failing on every attempt is reported as failed."""
+    task = MagicMock(side_effect=InternalError("⚠️Error"))
+    with patch('src.prefetch.time.sleep'):
+        assert prefetch([task], retries=2) == [False]
+    assert task.call_count == 3
+
+
+def test_prefetch_leaves_network_retries_to_client():
+    """Test that a failure caused by a network error is not retried again by prefetch."""
+    error = InternalError("⚠️Error while loading data from the server")
+    error.__cause__ = requests.ConnectionError()
+    task = MagicMock(side_effect=error)
+    with patch('src.prefetch.time.sleep') as mock_sleep:
+        assert prefetch([task], retries=3) == [False]
+    assert task.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+def test_start_prefetch_in_background():
+    """Test that start_prefetch runs the tasks on a daemon thread."""
+    task = MagicMock(return_value={})
+    thread = start_prefetch(tasks=[task])
+    thread.join(timeout=5)
+
+    assert thread.daemon
+    task.assert_called_once()
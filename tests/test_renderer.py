@@ -0,0 +1,114 @@
+"""
+Tests for the background graph renderer.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+from src.renderer import GraphRenderer
+
+
+def create_scope(running=True):
+    """Helper that creates a fake Kaleido scope with a running or crashed process."""
+    scope = MagicMock()
+    scope._proc.poll.return_value = None if running else 1
+
+    def restart():
+        scope._proc.poll.return_value = None
+    scope._shutdown_kaleido.side_effect = restart
+    return scope
+
+
+def test_renderer_renders_off_the_calling_thread():
+    """Test that jobs run on the renderer thread and results reach the callback."""
+    threads = []
+    delivered = threading.Event()
+    results = []
+
+    def render(source, monthly_charge):
+        threads.append(threading.current_thread())
+        return f"{source}-{monthly_charge}.png"
+
+    def callback(path):
+        results.append(path)
+        delivered.set()
+
+    renderer = GraphRenderer(render=render, scope=create_scope())
+    try:
+        future = renderer.submit("data", 500, callback=callback)
+        assert future.result(timeout=5) == "data-500.png"
+        assert delivered.wait(5)
+        assert results == ["data-500.png"]
+        assert threads[0] is not threading.current_thread()
+        assert renderer.rendered == 1
+    finally:
+        renderer.stop()
+
+
+def test_renderer_warms_up_the_export_process():
+    """Test that starting the renderer starts the export process."""
+    scope = create_scope()
+    renderer = GraphRenderer(render=lambda source, charge: "x.png", scope=scope)
+    renderer.start()
+    renderer.stop()
+    scope.transform.assert_called_once()
+
+
+def test_renderer_restarts_crashed_process():
+    """Test that a failed job restarts a crashed export process and is tried again."""
+    scope = create_scope()
+    calls = []
+
+    def render(source, monthly_charge):
+        calls.append(source)
+        if len(calls) == 1:
+            scope._proc.poll.return_value = 1
+            raise RuntimeError("export process died")
+        return "ok.png"
+
+    renderer = GraphRenderer(render=render, scope=scope)
+    try:
+        assert renderer.submit("data", 500).result(timeout=5) == "ok.png"
+        assert renderer.restarts == 1
+        assert renderer.is_healthy()
+    finally:
+        renderer.stop()
+
+
+def test_renderer_reports_errors_of_healthy_process():
+    """Test that errors not caused by a crash are passed to the future without a restart."""
+    def render(source, monthly_charge):
+        raise ValueError("bad data")
+
+    renderer = GraphRenderer(render=render, scope=create_scope())
+    try:
+        with pytest.raises(ValueError):
+            renderer.submit("data", 500).result(timeout=5)
+        assert renderer.restarts == 0
+    finally:
+        renderer.stop()
+
+
+def test_health_check_gives_up_after_max_restarts():
+    """Test that the health check stops restarting after max_restarts attempts."""
+    scope = create_scope(running=False)
+    scope._shutdown_kaleido.side_effect = None
+    renderer = GraphRenderer(scope=scope, max_restarts=2)
+    assert not renderer.check_health()
+    assert not renderer.check_health()
+    assert not renderer.check_health()
+    assert renderer.restarts == 2
+
+
+def test_health_check_restarts_again_after_window():
+    """Test that the restart limit applies per time window instead of switching restarts off for good."""
+    scope = create_scope(running=False)
+    scope._shutdown_kaleido.side_effect = None
+    renderer = GraphRenderer(scope=scope, max_restarts=1, restart_window=0.05)
+    renderer.check_health()
+    renderer.check_health()
+    assert renderer.restarts == 1
+    time.sleep(0.1)
+    renderer.check_health()
+    assert renderer.restarts == 2
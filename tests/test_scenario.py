@@ -0,0 +1,79 @@
+"""
+Tests for the advance payment scenario simulator.
+"""
+
+import numpy as np
+import pytest
+from src.calculate import calculate_tariff, TariffConfig
+from src.errors import InternalError
+from src.scenario import sweep_advances, required_advance, yearly_consumption
+
+CONFIG = {
+    "energy_price_per_kwh": 4.5,
+    "fixed_supplier_fee": 150,
+    "distribution_high_tariff": 2100,
+    "distribution_low_tariff": 300,
+    "high_tariff_ratio": 1.0,
+    "breaker_fee": 250,
+    "user_monthly_charge": 1500
+}
+
+ENTRIES = [
+    {"month": month, "month_number": i, "kwh": 1500, "diff": 0, "cost": 0, "source": "initial"}
+    for i, month in enumerate(["leden", "únor", "březen", "duben", "květen"])
+] + [{"month": "červen", "month_number": 5, "kwh": "300", "diff": 0, "cost": 0, "source": 0}]
+
+TARIFFS = [TariffConfig(price, 100, 2100, 300, 1.0, 250) for price in (3.5, 4.0, 4.5, 5.0)]
+
+
+def test_yearly_consumption():
+    """Test that the yearly consumption is projected from the recorded months."""
+    assert yearly_consumption(ENTRIES) == 3600
+
+
+def test_yearly_consumption_without_history():
+    """Test that an empty history raises InternalError."""
+    with pytest.raises(InternalError):
+        yearly_consumption([])
+
+
+def test_sweep_settlements():
+    """Test that every settlement is twelve advances minus the yearly cost."""
+    result = sweep_advances(ENTRIES, CONFIG, [2000, 1000, 1500], [0.9, 1.0, 1.1], TARIFFS)
+    assert result.settlements.shape == (3, 4, 3)
+    assert result.advances.tolist() == [1000, 1500, 2000]
+    cost = calculate_tariff(12, 3600 * 1.1, TARIFFS[2])
+    assert result.yearly_cost[2, 2] == cost
+    assert result.settlements[0, 2, 2] == pytest.approx(1000 * 12 - cost)
+
+
+def test_sweep_minimal_advance():
+    """Test that the minimal advance is the smallest one without a debt."""
+    advances = np.arange(1000, 5000, 10)
+    result = sweep_advances(ENTRIES, CONFIG, advances, tariffs=TARIFFS)
+    for i, tariff in enumerate(TARIFFS):
+        cost = calculate_tariff(12, 3600, tariff)
+        expected = advances[advances * 12 >= cost].min()
+        assert result.minimal_advance[i, 0] == expected
+
+
+def test_sweep_without_sufficient_advance():
+    """Test that a grid without a sufficient advance reports NaN."""
+    result = sweep_advances(ENTRIES, CONFIG, [100, 200])
+    assert np.isnan(result.minimal_advance).all()
+
+
+def test_sweep_process_pool_matches_serial():
+    """Test that a sweep split between processes gives the same result."""
+    serial = sweep_advances(ENTRIES, CONFIG, np.arange(1000, 3000, 50), [0.9, 1.0], TARIFFS)
+    parallel = sweep_advances(ENTRIES, CONFIG, np.arange(1000, 3000, 50), [0.9, 1.0], TARIFFS, workers=2)
+    assert np.array_equal(serial.settlements, parallel.settlements)
+    assert np.array_equal(serial.minimal_advance, parallel.minimal_advance, equal_nan=True)
+
+
+def test_required_advance():
+    """Test the smallest whole advance avoiding a debt with the saved config."""
+    advance = required_advance(ENTRIES, CONFIG)
+    cost = calculate_tariff(12, 3600, TariffConfig(4.5, 150, 2100, 300, 1.0, 250))
+    assert advance * 12 >= cost
+    assert (advance - 1) * 12 < cost
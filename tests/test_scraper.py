@@ -7,7 +7,10 @@ import pytest
 from bs4 import BeautifulSoup
 import requests
 from src.errors import InternalError
-from src.scraper import scrape_supplier, extract_price, scrape_distributor, scrape_breaker
+from src import snapshot
+from src.scraper import scrape_supplier, extract_price, scrape_distributor, scrape_breaker, fetch_page, clear_page_cache, \
+    build_supplier_index, find_supplier_tariffs, build_price_matrix, save_price_matrix, load_price_matrix, \
+    stream_supplier, stream_distributor, stream_breaker
 
 # @generated Claude.ai mock HTML contents
 #Mock HTML content for supplier tests
@@ -72,9 +75,18 @@ MOCK_BREAKER_HTML = """
 </table>
 """
 
+@pytest.fixture(autouse=True)
+def empty_page_cache(monkeypatch):
+    """Makes every test start without cached documents and without the disk snapshot cache."""
+    monkeypatch.setattr(snapshot, "settings", snapshot.SnapshotSettings(cache_dir=None))
+    clear_page_cache()
+    yield
+    clear_page_cache()
+
+
 def test_scrape_supplier_success():
     """Test successful scraping of supplier tariff data."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text=MOCK_SUPPLIER_HTML
         mock_response.raise_for_status=MagicMock()
@@ -90,7 +102,7 @@ def test_scrape_supplier_success():
 
 def test_scrape_supplier_no_match():
     """Test scraping when no matching supplier is found."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text=MOCK_SUPPLIER_HTML
         mock_response.raise_for_status=MagicMock()
@@ -102,7 +114,7 @@ def test_scrape_supplier_no_match():
 
 def test_scrape_supplier_request_error():
     """Test handling of request errors during supplier scraping."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_get.side_effect=requests.RequestException("Connection error")
 
         with pytest.raises(InternalError, match="⚠️Error while loading data from the server"):
@@ -126,7 +138,7 @@ def test_extract_price():
 
 def test_scrape_distributor_dual_tariff():
     """Test scraping of distributor data with both high and low tariffs."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text=MOCK_DISTRIBUTOR_HTML
         mock_response.raise_for_status=MagicMock()
@@ -141,7 +153,7 @@ def test_scrape_distributor_dual_tariff():
 
 def test_scrape_distributor_no_match():
     """Test scraping distributor data when no matching rate is found."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text = "<html></html>"
         mock_response.raise_for_status=MagicMock()
@@ -153,7 +165,7 @@ def test_scrape_distributor_no_match():
 
 def test_scrape_distributor_request_error():
     """Test handling of request errors during distributor scraping."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_get.side_effect=requests.RequestException("Connection error")
 
         with pytest.raises(InternalError, match="⚠️Error while loading data from the server"):
@@ -162,7 +174,7 @@ def test_scrape_distributor_request_error():
 
 def test_scrape_breaker_success():
     """Test successful scraping of breaker data."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text=MOCK_BREAKER_HTML
         mock_response.raise_for_status=MagicMock()
@@ -175,7 +187,7 @@ def test_scrape_breaker_success():
 
 def test_scrape_breaker_no_match():
     """Test scraping breaker data when no matching breaker is found."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response=MagicMock()
         mock_response.text=MOCK_BREAKER_HTML
         mock_response.raise_for_status=MagicMock()
@@ -188,7 +200,7 @@ def test_scrape_breaker_no_match():
 
 def test_scrape_breaker_request_error():
     """Test handling of request errors during breaker scraping."""
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_get.side_effect=requests.RequestException("Connection error")
 
         with pytest.raises(InternalError, match="⚠️Error while loading data from the server"):
@@ -226,7 +238,7 @@ def test_integration_with_complex_html():
     </html>
     """
 
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_response = MagicMock()
         mock_response.text = complex_html
         mock_response.raise_for_status = MagicMock()
@@ -241,3 +253,226 @@ def test_integration_with_complex_html():
         assert result[1]["tariff_name"] == "Basic Tariff"
         assert result[1]["price_kwh"] == "4.15 Kč/kWh"
         assert result[1]["price_month"] == "120 Kč/měsíc"
+
+
+def test_fetch_page_reuses_parsed_document():
+    """Test that a second lookup on the same page does not download it again."""
+    with patch('requests.Session.get') as mock_get:
+        mock_response = MagicMock()
+        mock_response.text = MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+
+        first = fetch_page("https://example.com/prices")
+        second = fetch_page("https://example.com/prices")
+
+        assert first is second
+        assert mock_get.call_count == 1
+
+
+def test_fetch_page_expired_ttl():
+    """Test that a document older than the TTL is downloaded again."""
+    with patch('requests.Session.get') as mock_get:
+        mock_response = MagicMock()
+        mock_response.text = MOCK_BREAKER_HTML
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+
+        fetch_page("https://example.com/prices", ttl=0)
+        fetch_page("https://example.com/prices", ttl=0)
+
+        assert mock_get.call_count == 2
+
+
+def test_scrape_with_parsed_document():
+    """Test that scrape functions use a passed document without any request."""
+    soup = BeautifulSoup(MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML, 'lxml')
+    with patch('requests.Session.get') as mock_get:
+        assert scrape_distributor("D02d", "ČEZ Distribuce", soup=soup) == ["2.00Kč/kWh", "1.00Kč/kWh"]
+        assert scrape_breaker("D02d", "ČEZ Distribuce", "3x25A", soup=soup) == "100"
+        mock_get.assert_not_called()
+
+
+def test_build_supplier_index():
+    """Test that the supplier page is indexed by supplier and tariff name."""
+    soup = BeautifulSoup(MOCK_SUPPLIER_HTML, 'lxml')
+    index = build_supplier_index(soup)
+
+    assert list(index) == ["Test Supplier", "Other Supplier"]
+    assert index["Other Supplier"]["Economy Tariff"]["price_month"] == "120 Kč/měsíc"
+    assert find_supplier_tariffs(index, "Other")[0]["tariff_name"] == "Economy Tariff"
+    assert not find_supplier_tariffs(index, "Nonexistent Supplier")
+
+
+def test_scrape_supplier_switching_suppliers():
+    """Test that looking up several suppliers downloads and parses the page once."""
+    with patch('requests.Session.get') as mock_get, \
+            patch('src.scraper.build_supplier_index', wraps=build_supplier_index) as mock_index:
+        mock_response = MagicMock()
+        mock_response.text = MOCK_SUPPLIER_HTML
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+
+        assert scrape_supplier("Test Supplier")[0]["tariff_name"] == "Standard Tariff"
+        assert scrape_supplier("Other Supplier")[0]["tariff_name"] == "Economy Tariff"
+
+        assert mock_get.call_count == 1
+        assert mock_index.call_count == 1
+
+
+def test_build_price_matrix():
+    """Test that the regulated price matrix covers every requested combination."""
+    soup = BeautifulSoup(MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML, 'lxml')
+    matrix = build_price_matrix(soup, rates=["D02d", "D01d"],
+                                distributors=["ČEZ Distribuce", "PRE Distribuce"], breakers=["3x25A", "3x32A"])
+
+    assert matrix["D02d"]["ČEZ Distribuce"]["distribution"] == ["2.00Kč/kWh", "1.00Kč/kWh"]
+    assert matrix["D02d"]["PRE Distribuce"]["breakers"] == {"3x25A": "110", "3x32A": "140"}
+    assert matrix["D01d"]["ČEZ Distribuce"] == {"distribution": None, "breakers": {"3x25A": None, "3x32A": None}}
+
+
+def test_price_matrix_file_roundtrip(tmp_path):
+    """Test that a saved price matrix loads back unchanged."""
+    soup = BeautifulSoup(MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML, 'lxml')
+    matrix = build_price_matrix(soup)
+    file = str(tmp_path / "price_matrix.json")
+
+    save_price_matrix(matrix, file)
+
+    assert load_price_matrix(file) == matrix
+
+
+def test_scrape_distributor_uses_price_matrix():
+    """Test that lookups of known combinations are served from one parsed matrix."""
+    with patch('requests.Session.get') as mock_get, \
+            patch('src.scraper.build_price_matrix', wraps=build_price_matrix) as mock_matrix:
+        mock_response = MagicMock()
+        mock_response.text = MOCK_DISTRIBUTOR_HTML
+        mock_response.raise_for_status = MagicMock()
+        mock_get.return_value = mock_response
+
+        assert scrape_distributor("D02d", "ČEZ Distribuce") == ["2.00Kč/kWh", "1.00Kč/kWh"]
+        with pytest.raises(InternalError, match="⚠️No matching tariffs found"):
+            scrape_distributor("D01d", "EG.D")
+
+        assert mock_get.call_count == 1
+        assert mock_matrix.call_count == 1
+
+
+def mock_stream_response(html, chunk_size=64):
+    """Helper that builds a mocked streamed response and records how many chunks were read."""
+    data = html.encode("utf-8")
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    mock_response = MagicMock()
+    mock_response.encoding = None
+    mock_response.raise_for_status = MagicMock()
+    mock_response.read_chunks = 0
+    mock_response.total_chunks = len(chunks)
+
+    def iter_content(chunk_size=None):
+        for chunk in chunks:
+            mock_response.read_chunks += 1
+            yield chunk
+
+    mock_response.iter_content = iter_content
+    return mock_response
+
+
+def test_stream_supplier():
+    """Test streamed supplier scraping matches the full-document parser."""
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_stream_response(MOCK_SUPPLIER_HTML)
+        assert stream_supplier("Other Supplier") == scrape_supplier("Other Supplier", soup=BeautifulSoup(MOCK_SUPPLIER_HTML, 'lxml'))
+        with pytest.raises(InternalError, match="⚠️No matching tariffs found"):
+            stream_supplier("Nonexistent Supplier")
+
+
+def test_stream_supplier_limit_stops_download():
+    """Test that a streamed supplier lookup stops reading once the limit is reached."""
+    with patch('requests.Session.get') as mock_get:
+        mock_response = mock_stream_response(MOCK_SUPPLIER_HTML)
+        mock_get.return_value = mock_response
+
+        result = stream_supplier("Test Supplier", limit=1)
+
+        assert result[0]["tariff_name"] == "Standard Tariff"
+        assert mock_response.read_chunks < mock_response.total_chunks
+        mock_response.close.assert_called_once()
+
+
+def test_stream_distributor_stops_download():
+    """Test that streamed distribution prices stop the download after both tables."""
+    with patch('requests.Session.get') as mock_get:
+        mock_response = mock_stream_response(MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML)
+        mock_get.return_value = mock_response
+
+        assert stream_distributor("D02d", "ČEZ Distribuce") == ["2.00Kč/kWh", "1.00Kč/kWh"]
+        assert mock_response.read_chunks < mock_response.total_chunks
+
+
+def test_stream_breaker():
+    """Test streamed breaker fee lookup."""
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_stream_response(MOCK_DISTRIBUTOR_HTML + MOCK_BREAKER_HTML)
+        assert stream_breaker("D02d", "ČEZ Distribuce", "3x32A") == "130"
+        mock_get.return_value = mock_stream_response(MOCK_BREAKER_HTML)
+        assert stream_breaker("D02d", "ČEZ Distribuce", "3x40A") is None
+
+
+def mock_snapshot_response(text, status_code=200, headers=None):
+    """Helper that builds a mocked response carrying cache validators."""
+    mock_response = MagicMock()
+    mock_response.text = text
+    mock_response.status_code = status_code
+    mock_response.headers = headers or {}
+    mock_response.raise_for_status = MagicMock()
+    return mock_response
+
+
+def test_snapshot_conditional_revalidation(tmp_path):
+    """Test that a stale snapshot is revalidated with its ETag and reused on 304."""
+    snapshot.settings = snapshot.SnapshotSettings(cache_dir=str(tmp_path), max_age=0, stale_while_revalidate=False)
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_snapshot_response(MOCK_SUPPLIER_HTML, headers={"ETag": '"v1"'})
+        scrape_supplier("Test Supplier")
+
+        clear_page_cache()
+        mock_get.return_value = mock_snapshot_response("", status_code=304)
+        result = scrape_supplier("Test Supplier")
+
+        assert result[0]["tariff_name"] == "Standard Tariff"
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
+def test_snapshot_offline_mode(tmp_path):
+    """Test that offline mode serves the stored tables without any request."""
+    snapshot.settings = snapshot.SnapshotSettings(cache_dir=str(tmp_path))
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_snapshot_response(MOCK_SUPPLIER_HTML)
+        scrape_supplier("Test Supplier")
+
+    clear_page_cache()
+    snapshot.settings.offline = True
+    with patch('requests.Session.get') as mock_get:
+        result = scrape_supplier("Test Supplier")
+        assert result[0]["price_kwh"] == "5.50 Kč/kWh"
+        mock_get.assert_not_called()
+
+
+def test_snapshot_offline_without_data(tmp_path):
+    """Test that offline mode without a stored snapshot reports an error."""
+    snapshot.settings = snapshot.SnapshotSettings(cache_dir=str(tmp_path), offline=True)
+    with pytest.raises(InternalError, match="⚠️No saved data available offline"):
+        scrape_supplier("Test Supplier")
+
+
+def test_snapshot_write_failure_does_not_fail_download(tmp_path):
+    """Test that a cache directory that cannot be written does not fail the download."""
+    blocked = tmp_path / "cache"
+    blocked.write_text("not a directory")
+    snapshot.settings = snapshot.SnapshotSettings(cache_dir=str(blocked))
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value = mock_snapshot_response(MOCK_SUPPLIER_HTML)
+        result = scrape_supplier("Test Supplier")
+
+    assert result[0]["tariff_name"] == "Standard Tariff"
@@ -0,0 +1,130 @@
+"""
+Tests for the SQLite storage backend.
+"""
+
+import os
+import tempfile
+from datetime import date
+import pytest
+from src.calculate import Aggregates
+from src.errors import InternalError
+from src.sqlite_storage import SqliteBackend, billing_period
+from src.state import StateStore
+
+ENTRIES = [
+    {"month": "leden", "month_number": 0, "kwh": 300, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "únor", "month_number": 1, "kwh": 300, "diff": -50.5, "cost": 550.5, "source": "initial"},
+    {"month": "březen", "month_number": 2, "kwh": "200", "diff": 20.0, "cost": 480.0, "source": 0},
+]
+
+
+def create_backend(period="2024-01"):
+    """Helper that creates a backend with a temporary database."""
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".db")
+    os.close(temp_fd)
+    return SqliteBackend(temp_path, household="test", period=period)
+
+
+def remove_backend(backend):
+    """Helper that closes the backend and removes its database."""
+    backend.close()
+    os.remove(backend.path)
+
+
+def test_entries_roundtrip():
+    """Test that stored entries load back unchanged, including source types."""
+    backend = create_backend()
+    try:
+        backend.append_entries(ENTRIES)
+        assert backend.load_entries() == ENTRIES
+
+        backend.replace_entries(ENTRIES[:2])
+        assert backend.load_entries() == ENTRIES[:2]
+    finally:
+        remove_backend(backend)
+
+
+def test_config_and_clear():
+    """Test storing a config and clearing the period."""
+    backend = create_backend()
+    try:
+        backend.save_config({"user_monthly_charge": 500})
+        backend.append_entries(ENTRIES)
+        assert backend.load_config() == {"user_monthly_charge": 500}
+
+        backend.clear()
+        assert backend.load_config() is None
+        assert backend.load_entries() == []
+    finally:
+        remove_backend(backend)
+
+
+def test_sql_aggregates():
+    """Test that aggregates computed in SQL match the Python ones and that periods are kept apart."""
+    backend = create_backend()
+    try:
+        backend.append_entries(ENTRIES)
+        SqliteBackend(backend.path, household="test", period="2023-01").append_entries(ENTRIES[:1])
+
+        assert backend.query_aggregates() == Aggregates.from_entries(ENTRIES).to_dict()
+        assert backend.query_aggregates(period="2022-01")["count"] == 0
+        assert backend.period_history() == [("2023-01", 550.5, -50.5, 1), ("2024-01", 1581.0, -81.0, 3)]
+    finally:
+        remove_backend(backend)
+
+
+def test_billing_period_spans_new_year():
+    """Test that a period started before New Year is still the current one in January."""
+    assert billing_period({"end": 4}, today=date(2025, 1, 1)) == "2024-04"
+    assert billing_period({"end": 4}, today=date(2025, 4, 30)) == "2025-04"
+
+
+def test_current_period_survives_restart():
+    """Test that a new backend continues the period started by the saved config, and clear ends it."""
+    backend = create_backend(period=None)
+    try:
+        with pytest.raises(InternalError):
+            backend.append_entries(ENTRIES)
+        backend.save_config({"end": 4, "user_monthly_charge": 500})
+        backend.append_entries(ENTRIES)
+        restarted = SqliteBackend(backend.path, household="test")
+        assert restarted.period == backend.period
+        assert restarted.load_entries() == ENTRIES
+
+        restarted.clear()
+        assert SqliteBackend(backend.path, household="test").period is None
+    finally:
+        remove_backend(backend)
+
+
+def test_queries_use_indexes():
+    """Test that period and source queries are answered through the indexes."""
+    backend = create_backend()
+    try:
+        plan = backend._query(  # pylint: disable=protected-access
+            "EXPLAIN QUERY PLAN SELECT SUM(diff) FROM entries WHERE household=? AND period=? AND month_number=?",
+            ("test", "2024-01", 1)
+        )
+        assert "entries_period" in str(plan)
+        plan = backend._query(  # pylint: disable=protected-access
+            "EXPLAIN QUERY PLAN SELECT SUM(diff) FROM entries WHERE household=? AND period=? AND source=?",
+            ("test", "2024-01", 0)
+        )
+        assert "entries_source" in str(plan)
+    finally:
+        remove_backend(backend)
+
+
+def test_store_with_sqlite_backend():
+    """Test that the state store persists to SQLite and uses its aggregates."""
+    backend = create_backend()
+    try:
+        backend.append_entries(ENTRIES[:2])
+        store = StateStore(backend, flush_delay=60)
+        assert store.aggregates().to_dict() == Aggregates.from_entries(ENTRIES[:2]).to_dict()
+        store.append_entries(ENTRIES[2:])
+        assert store.recalculation() == -81
+        store.flush()
+        assert backend.load_entries() == ENTRIES
+    finally:
+        remove_backend(backend)
@@ -0,0 +1,205 @@
+"""
+Tests for the in-process state store.
+"""
+
+import os
+import tempfile
+import time
+from unittest.mock import patch
+from src.errors import InternalError
+from src.state import StateStore
+from src.storage import load_data, save_data, save_data_append, delete_file, JsonBackend
+
+
+def create_store(flush_delay=60):
+    """Helper that creates a store backed by temporary files."""
+    directory = tempfile.mkdtemp()
+    backend = JsonBackend(
+        os.path.join(directory, "graph.json"),
+        os.path.join(directory, "config.json"),
+        os.path.join(directory, "aggregates.json")
+    )
+    return StateStore(backend, flush_delay)
+
+
+def remove_store_files(store):
+    """Helper that removes the files of a store."""
+    store.invalidate()
+    delete_file(store.backend.graph_file)
+    delete_file(store.backend.config_file)
+    delete_file(store.backend.aggregates_file)
+    os.rmdir(os.path.dirname(store.backend.graph_file))
+
+
+def test_store_reads_files_once():
+    """Test that the store loads its files on first access only."""
+    store = create_store()
+    save_data([{"diff": 1}], store.backend.graph_file)
+    save_data({"user_monthly_charge": 100}, store.backend.config_file)
+
+    try:
+        with patch('src.storage.load_data', wraps=load_data) as mock_load:
+            for _ in range(5):
+                assert store.entries == [{"diff": 1}]
+                assert store.config["user_monthly_charge"] == 100
+        assert mock_load.call_count == 2
+    finally:
+        remove_store_files(store)
+
+
+def test_store_missing_files_are_empty():
+    """Test that a store without files starts empty."""
+    store = create_store()
+    try:
+        assert store.entries == []
+        assert store.config is None
+    finally:
+        remove_store_files(store)
+
+
+def test_store_coalesces_writes():
+    """Test that several changes are written to disk in one flush."""
+    store = create_store(flush_delay=0.05)
+    try:
+        with patch('src.storage.JsonBackend.append_entries', autospec=True) as mock_flush:
+            store.append_entries([{"diff": 1}])
+            store.append_entries([{"diff": 2}, {"diff": 3}])
+            time.sleep(0.3)
+        assert mock_flush.call_count == 1
+
+        store.append_entries([{"diff": 4}])
+        store.flush()
+        assert [entry["diff"] for entry in load_data(store.backend.graph_file)] == [4]
+    finally:
+        remove_store_files(store)
+
+
+def test_store_retries_failed_background_write():
+    """Test that a failed background write is logged and its changes are written with the next change."""
+    store = create_store(flush_delay=0.05)
+    try:
+        with patch('src.storage.JsonBackend.append_entries', autospec=True,
+                   side_effect=InternalError("⚠️Error saving JSON file")), \
+                patch('src.state.logger') as mock_logger:
+            store.append_entries([{"diff": 1}])
+            time.sleep(0.3)
+        mock_logger.exception.assert_called_once()
+
+        store.append_entries([{"diff": 2}])
+        time.sleep(0.3)
+        assert load_data(store.backend.graph_file) == [{"diff": 1}, {"diff": 2}]
+    finally:
+        remove_store_files(store)
+
+
+def test_store_flush_persists_changes():
+    """Test that appended entries, replacements and config reach the files."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1}, {"diff": 2}])
+        store.set_config({"user_monthly_charge": 100})
+        store.flush()
+        assert load_data(store.backend.graph_file) == [{"diff": 1}, {"diff": 2}]
+
+        store.replace_entries([{"diff": 1}])
+        store.append_entries([{"diff": 5}])
+        store.flush()
+        assert load_data(store.backend.graph_file) == [{"diff": 1}, {"diff": 5}]
+        assert load_data(store.backend.config_file) == {"user_monthly_charge": 100}
+    finally:
+        remove_store_files(store)
+
+
+def test_store_clear_resets_state():
+    """Test that clearing drops pending changes and empties the files."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1}])
+        store.flush()
+        version = store.version
+        store.append_entries([{"diff": 2}])
+        store.clear()
+        store.flush()
+
+        assert store.version > version
+        assert store.entries == []
+        assert store.config is None
+        assert load_data(store.backend.graph_file) == []
+    finally:
+        remove_store_files(store)
+
+
+def test_store_keeps_running_aggregates():
+    """Test that appends and truncations update the aggregates without a rescan."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1, "source": "initial"}, {"diff": 2, "source": "initial"}])
+        aggregates = store.aggregates()
+        with patch('src.calculate.Aggregates.from_entries') as mock_scan:
+            store.append_entries([{"diff": 3, "source": 0}, {"diff": 4, "source": 0}])
+            assert store.recalculation() == 10
+            store.truncate_entries(2)
+            assert store.recalculation() == 3
+        mock_scan.assert_not_called()
+        assert store.aggregates() is aggregates
+        assert store.entries == [{"diff": 1, "source": "initial"}, {"diff": 2, "source": "initial"}]
+        assert list(aggregates.sources) == ["initial"]
+        store.flush()
+        assert load_data(store.backend.graph_file) == store.entries
+    finally:
+        remove_store_files(store)
+
+
+def test_store_restores_saved_aggregates():
+    """Test that saved aggregates are used after a restart instead of scanning the entries."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1, "cost": 10}, {"diff": 2, "cost": 20}])
+        store.close()
+        store.invalidate()
+        with patch('src.calculate.Aggregates.from_entries') as mock_scan:
+            assert store.aggregates().total_cost == 30
+            assert store.yearly_recalculation() == 18
+        mock_scan.assert_not_called()
+    finally:
+        remove_store_files(store)
+
+
+def test_store_ignores_stale_aggregates():
+    """Test that aggregates that do not belong to the stored entries are computed again."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1}, {"diff": 2}])
+        store.close()
+        save_data([{"diff": 7}, {"diff": 2}], store.backend.graph_file)
+        store.invalidate()
+        assert store.recalculation() == 9
+    finally:
+        remove_store_files(store)
+
+
+def test_store_ignores_aggregates_before_append():
+    """Test that aggregates saved before a record was appended to the log are computed again."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1}, {"diff": 2}])
+        store.close()
+        save_data_append({"diff": 4}, store.backend.graph_file)
+        store.invalidate()
+        assert store.recalculation() == 7
+    finally:
+        remove_store_files(store)
+
+
+def test_store_flush_writes_entries_only():
+    """Test that a flush does not write the aggregates, which are saved on close."""
+    store = create_store()
+    try:
+        store.append_entries([{"diff": 1}])
+        store.flush()
+        assert not os.path.isfile(store.backend.aggregates_file)
+
+        store.close()
+        assert load_data(store.backend.aggregates_file)["aggregates"]["count"] == 1
+    finally:
+        remove_store_files(store)
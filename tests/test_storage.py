@@ -5,9 +5,12 @@ Tests for JSON file input/output functions without using fixtures.
 import json
 import os
 import tempfile
+from unittest.mock import patch
 import pytest
+from src import storage
 from src.errors import InternalError
-from src.storage import load_data, save_data, save_data_append, delete_file
+from src.storage import load_data, save_data, save_data_append, delete_file, compact_data, \
+    log_path, save_data_batch, checksum_path, file_lock, corrupt_path, JsonBackend, merging_log_path
 
 
 def create_temp_json_file():
@@ -146,3 +149,241 @@ def test_save_data_append_to_non_list():
         assert "⚠️Error saving JSON file" in str(exc_info.value)
     finally:
         delete_file(temp_path)
+
+
+def test_save_data_append_writes_log_only():
+    """Test that appending does not rewrite the JSON file and load_data merges the log."""
+    temp_path = create_temp_json_file()
+
+    try:
+        with open(temp_path, "r", encoding="utf-8") as f:
+            original = f.read()
+
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        save_data_append({"name": "test4", "value": 4}, temp_path)
+
+        with open(temp_path, "r", encoding="utf-8") as f:
+            assert f.read() == original
+        assert [item["value"] for item in load_data(temp_path)] == [1, 2, 3, 4]
+    finally:
+        delete_file(temp_path)
+
+    assert not os.path.isfile(log_path(temp_path))
+
+
+def test_compact_data_merges_log():
+    """Test that compaction moves appended records into the JSON file."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        compact_data(temp_path)
+
+        assert not os.path.isfile(log_path(temp_path))
+        with open(temp_path, "r", encoding="utf-8") as f:
+            assert len(json.load(f)) == 3
+    finally:
+        delete_file(temp_path)
+
+
+@pytest.mark.parametrize("written", [False, True])
+def test_interrupted_compaction_keeps_records_once(written):
+    """Test that a compaction crashing before or after writing the file loads every record once."""
+    temp_path = create_temp_json_file()
+    save_text = storage.save_text
+
+    def crash(text, file):
+        if file != temp_path or written:
+            save_text(text, file)
+        if file == temp_path:
+            raise SystemExit
+
+    try:
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        with patch('src.storage.save_text', side_effect=crash):
+            with pytest.raises(SystemExit):
+                compact_data(temp_path)
+
+        assert os.path.isfile(merging_log_path(temp_path))
+        assert [item["value"] for item in load_data(temp_path)] == [1, 2, 3]
+
+        save_data_append({"name": "test4", "value": 4}, temp_path)
+        assert not os.path.isfile(merging_log_path(temp_path))
+        assert [item["value"] for item in load_data(temp_path)] == [1, 2, 3, 4]
+    finally:
+        delete_file(temp_path)
+
+
+def test_load_data_skips_torn_log_line():
+    """Test that a partially written last log line is ignored, also after a further append."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        with open(log_path(temp_path), "a", encoding="utf-8") as f:
+            f.write('{"name": "te')
+
+        assert len(load_data(temp_path)) == 3
+
+        save_data_append({"name": "test4", "value": 4}, temp_path)
+        assert [item["value"] for item in load_data(temp_path)] == [1, 2, 3, 4]
+    finally:
+        delete_file(temp_path)
+
+
+def test_load_data_quarantines_corrupted_log_line():
+    """Test that a complete log line failing its checksum moves the file and its log aside."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        with open(log_path(temp_path), "rb") as f:
+            line = f.read()
+        with open(log_path(temp_path), "wb") as f:
+            f.write(line.replace(b'"value": 3', b'"value": 4'))
+
+        with pytest.raises(InternalError, match="⚠️Checksum of JSON log does not match"):
+            load_data(temp_path)
+
+        assert not os.path.isfile(temp_path)
+        assert os.path.isfile(corrupt_path(log_path(temp_path)))
+    finally:
+        delete_file(temp_path)
+        delete_file(corrupt_path(temp_path))
+        delete_file(corrupt_path(log_path(temp_path)))
+
+
+def test_save_data_replaces_log():
+    """Test that saving a whole list drops previously appended records."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data_append({"name": "test3", "value": 3}, temp_path)
+        save_data([{"name": "only", "value": 0}], temp_path)
+
+        assert load_data(temp_path) == [{"name": "only", "value": 0}]
+    finally:
+        delete_file(temp_path)
+
+
+def test_save_data_batch():
+    """Test that a batch of records is appended in order."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data_batch([{"name": "test3", "value": 3}, {"name": "test4", "value": 4}], temp_path)
+
+        assert [item["value"] for item in load_data(temp_path)] == [1, 2, 3, 4]
+    finally:
+        delete_file(temp_path)
+
+
+def test_save_data_failure_keeps_previous_content():
+    """Test that a save failing midway leaves the previous file content untouched."""
+    temp_path = create_temp_json_file()
+
+    try:
+        with pytest.raises(InternalError):
+            save_data([{"name": "broken", "value": object()}], temp_path)
+
+        assert len(load_data(temp_path)) == 2
+        assert not [name for name in os.listdir(os.path.dirname(temp_path)) if name.endswith(".tmp")
+                    and os.path.basename(temp_path) in name]
+    finally:
+        delete_file(temp_path)
+
+
+def test_load_data_detects_checksum_mismatch():
+    """Test that a file modified behind the checksum is reported as corrupted."""
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".json")
+    os.close(temp_fd)
+
+    try:
+        save_data([{"name": "test1", "value": 1}], temp_path)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write('[{"name": "te')
+
+        with pytest.raises(InternalError, match="⚠️Checksum of JSON file does not match"):
+            load_data(temp_path)
+
+        assert not os.path.isfile(temp_path)
+        assert not os.path.isfile(checksum_path(temp_path))
+        with open(corrupt_path(temp_path), "r", encoding="utf-8") as f:
+            assert f.read() == '[{"name": "te'
+    finally:
+        delete_file(temp_path)
+        delete_file(corrupt_path(temp_path))
+        delete_file(corrupt_path(checksum_path(temp_path)))
+
+
+def test_load_data_rereads_checksum_replaced_during_read():
+    """Test that a checksum replaced while the file is read is read again instead of quarantined."""
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".json")
+    os.close(temp_fd)
+    load_digests = storage._load_digests  # pylint: disable=protected-access
+
+    try:
+        save_data([1], temp_path)
+        with patch('src.storage._load_digests', side_effect=[["0" * 64], load_digests(temp_path)]):
+            assert load_data(temp_path) == [1]
+
+        assert not os.path.isfile(corrupt_path(temp_path))
+    finally:
+        delete_file(temp_path)
+
+
+def test_append_to_corrupted_file_is_quarantined():
+    """Test that records appended to a corrupted file are moved aside with it on load."""
+    directory = tempfile.mkdtemp()
+    graph_file = os.path.join(directory, "graph.json")
+    backend = JsonBackend(graph_file, os.path.join(directory, "config.json"))
+
+    try:
+        save_data([{"name": "test1", "value": 1}], graph_file)
+        with open(graph_file, "w", encoding="utf-8") as f:
+            f.write('[{"name": "test1", "value": 2}]')
+
+        backend.append_entries([{"name": "test2", "value": 2}])
+        assert backend.load_entries() == []
+        with open(corrupt_path(log_path(graph_file)), "r", encoding="utf-8") as f:
+            assert '"test2"' in f.read()
+
+        backend.append_entries([{"name": "test3", "value": 3}])
+        assert backend.load_entries() == [{"name": "test3", "value": 3}]
+    finally:
+        delete_file(graph_file)
+        delete_file(corrupt_path(graph_file))
+        delete_file(corrupt_path(log_path(graph_file)))
+        delete_file(corrupt_path(checksum_path(graph_file)))
+        os.rmdir(directory)
+
+
+def test_load_data_during_interrupted_save():
+    """Test that the previous content still verifies while a save is in progress."""
+    temp_fd, temp_path = tempfile.mkstemp(suffix=".json")
+    os.close(temp_fd)
+
+    try:
+        save_data([1], temp_path)
+        with open(checksum_path(temp_path), "r", encoding="utf-8") as f:
+            old_digest = f.read()
+        with open(checksum_path(temp_path), "w", encoding="utf-8") as f:
+            f.write(f"{'0' * 64} {old_digest}")
+
+        assert load_data(temp_path) == [1]
+    finally:
+        delete_file(temp_path)
+
+
+def test_save_data_with_lock():
+    """Test that locked writes work and the lock can be taken again afterwards."""
+    temp_path = create_temp_json_file()
+
+    try:
+        save_data([{"name": "locked", "value": 1}], temp_path, lock=True)
+        save_data_batch([{"name": "locked", "value": 2}], temp_path, lock=True)
+        with file_lock(temp_path):
+            assert len(load_data(temp_path)) == 2
+    finally:
+        delete_file(temp_path)
+        delete_file(f"{temp_path}.lock")
@@ -0,0 +1,61 @@
+"""
+Tests for running view handler requests so that only the latest one takes effect.
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+import pytest
+from gui.components.tasks import LatestRequest, ProgressIndicator
+
+
+async def wait_forever():
+    """Request that runs until it is cancelled."""
+    await asyncio.sleep(3600)
+
+
+def test_newer_request_cancels_older():
+    """Test that a newer request cancels the running one, which returns None."""
+    async def scenario():
+        latest = LatestRequest(MagicMock())
+        older = asyncio.create_task(latest.run(wait_forever))
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(latest.run(asyncio.sleep, 0, "result"))
+        return await older, await newer
+
+    assert asyncio.run(scenario()) == (None, "result")
+
+
+def test_progress_is_hidden_by_latest_request_only():
+    """Test that the cancelled request leaves the progress visible while the newer one runs."""
+    async def scenario():
+        progress = ProgressIndicator()
+        latest = LatestRequest(MagicMock(), progress)
+        release = asyncio.Event()
+        older = asyncio.create_task(latest.run(wait_forever))
+        await asyncio.sleep(0)
+        assert progress.visible
+
+        newer = asyncio.create_task(latest.run(release.wait))
+        assert await older is None
+        assert progress.visible
+
+        release.set()
+        await newer
+        assert not progress.visible
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_latest_request_raises():
+    """Test that cancelling the latest request itself propagates and hides the progress."""
+    async def scenario():
+        progress = ProgressIndicator()
+        latest = LatestRequest(MagicMock(), progress)
+        task = asyncio.create_task(latest.run(wait_forever))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not progress.visible
+
+    asyncio.run(scenario())
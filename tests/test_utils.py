@@ -3,7 +3,7 @@ Tests for utility functions
 """
 
 from pytest import raises
-from src.utils import get_month_range, count_months, to_float
+from src.utils import get_month_range, count_months, to_float, get_distributor, get_high_percentage
 from src.errors import InternalError
 from data.constants import CZECH_MONTHS
 
@@ -42,3 +42,16 @@ def test_to_float_invalid_inputs():
 
     with raises(InternalError, match="⚠️Not a number"):
         to_float("")
+
+
+def test_get_distributor():
+    """Test get_distributor."""
+    assert get_distributor("Praha") == "PREdistribuce"
+    assert get_distributor("Vysočina") == "EG.D"
+    assert get_distributor("Ústecký kraj") == "ČEZ Distribuce"
+
+
+def test_get_high_percentage():
+    """Test get_high_percentage."""
+    assert get_high_percentage("D25d") == 0.65
+    assert get_high_percentage("D02d") == 1.0